@@ -0,0 +1,173 @@
+/**
+ * Sharded Search
+ * ==============
+ * Client for the index the converter writes to static/search-index/
+ * (scripts/o2h_search.py). docs.json is loaded once; after that only the
+ * term shards a query needs are fetched, each at most once per page view.
+ */
+
+(function() {
+    const root = document.getElementById('sharded-search');
+    if (!root) {
+        return;
+    }
+
+    const base = root.dataset.index;
+    const input = root.querySelector('.search-input');
+    const results = root.querySelector('.search-results');
+    const status = root.querySelector('.search-status');
+    const facets = root.querySelectorAll('select[data-facet]');
+    const shards = new Map();   // shard key → Promise of {term: [[doc id, weight], …]}
+    const limit = 50;
+    let index = null;           // docs.json
+    let stop = new Set();
+    let latest = 0;             // newest query; older answers are dropped
+    let timer = null;
+
+    /**
+     * Same rules as o2h_search.tokens(): lowercase word runs, 2..max_term
+     * characters, no stop words.
+     */
+    function tokens(text) {
+        return (text.toLowerCase().match(/[\p{L}\p{N}_]+/gu) || [])
+            .filter(t => t.length >= 2 && t.length <= index.max_term && !stop.has(t));
+    }
+
+    function shardKey(term) {
+        const head = term.slice(0, index.prefix);
+        return /^[a-z0-9]+$/.test(head) ? head : '_';
+    }
+
+    function shard(key) {
+        if (!index.shards.includes(key)) {
+            return Promise.resolve({});
+        }
+        if (!shards.has(key)) {
+            shards.set(key, fetch(`${base}s/${key}.json`)
+                .then(r => (r.ok ? r.json() : {}))
+                .catch(() => ({})));
+        }
+        return shards.get(key);
+    }
+
+    /**
+     * doc id → score for one query term. Terms it prefixes count at half
+     * weight, so "kerb" already finds "kerberoasting".
+     */
+    async function match(term) {
+        const scores = new Map();
+        const postings = await shard(shardKey(term));
+        for (const [t, list] of Object.entries(postings)) {
+            if (!t.startsWith(term)) {
+                continue;
+            }
+            const factor = t === term ? 1 : 0.5;
+            for (const [id, weight] of list) {
+                scores.set(id, Math.max(scores.get(id) || 0, weight * factor));
+            }
+        }
+        return scores;
+    }
+
+    function selected() {
+        const picked = [];
+        facets.forEach(select => {
+            if (select.value) {
+                picked.push([select.dataset.facet, select.value]);
+            }
+        });
+        return picked;
+    }
+
+    async function search() {
+        const query = ++latest;
+        const terms = tokens(input.value);
+        const picked = selected();
+        if (!terms.length && !picked.length) {
+            render([], '');
+            return;
+        }
+
+        let scores = null;   // null: no terms, every document matches
+        if (terms.length) {
+            const perTerm = await Promise.all(terms.map(match));
+            if (query !== latest) {
+                return;
+            }
+            // Every term must match; scores add up.
+            scores = perTerm.reduce((acc, s) => {
+                const both = new Map();
+                for (const [id, v] of acc) {
+                    if (s.has(id)) {
+                        both.set(id, v + s.get(id));
+                    }
+                }
+                return both;
+            });
+        }
+
+        const hits = [];
+        index.docs.forEach((doc, id) => {
+            if (!doc || (scores && !scores.has(id))) {
+                return;
+            }
+            if (picked.every(([facet, value]) => (doc[facet] || []).includes(value))) {
+                hits.push([scores ? scores.get(id) : 0, doc]);
+            }
+        });
+        hits.sort((a, b) => b[0] - a[0] || b[1].date.localeCompare(a[1].date));
+        render(hits.slice(0, limit).map(h => h[1]),
+               `${hits.length} result${hits.length === 1 ? '' : 's'}`);
+    }
+
+    function render(docs, text) {
+        results.replaceChildren(...docs.map(doc => {
+            const li = document.createElement('li');
+            const a = document.createElement('a');
+            a.href = doc.url;
+            a.textContent = doc.title;
+            li.appendChild(a);
+            if (doc.date) {
+                const time = document.createElement('time');
+                time.dateTime = doc.date;
+                time.textContent = doc.date;
+                li.appendChild(time);
+            }
+            return li;
+        }));
+        status.textContent = text;
+    }
+
+    function fillFacets() {
+        facets.forEach(select => {
+            const values = new Set();
+            index.docs.forEach(doc => (doc && doc[select.dataset.facet] || []).forEach(v => values.add(v)));
+            [...values].sort((a, b) => a.localeCompare(b)).forEach(v => {
+                const option = document.createElement('option');
+                option.value = v;
+                option.textContent = v;
+                select.appendChild(option);
+            });
+        });
+    }
+
+    fetch(`${base}docs.json`)
+        .then(r => r.json())
+        .then(data => {
+            index = data;
+            stop = new Set(data.stop);
+            fillFacets();
+            input.disabled = false;
+            input.addEventListener('input', () => {
+                clearTimeout(timer);
+                timer = setTimeout(search, 120);
+            });
+            facets.forEach(select => select.addEventListener('change', search));
+            if (input.value) {
+                search();
+            }
+        })
+        .catch(() => {
+            status.textContent = 'Search index unavailable.';
+        });
+})();
@@ -0,0 +1,2604 @@
+#!/usr/bin/env python3
+"""
+o2h_convert.py
+==============
+Fast, incremental Obsidian → Hugo converter. Run it through
+``obsidian_to_hugo_converter.py`` (or ``python3 -m o2h_convert``).
+
+Design goals
+------------
+- Idempotent: same input ⇒ identical output, byte-for-byte.
+- Incremental: skip files whose stat tuple (size, mtime_ns, inode) — or, when
+  that moved, whose SHA-1 — matches the last successful run.
+- Parallel: thread pool for IO + Pillow (PIL releases the GIL during encode),
+  fed by the planner through a bounded queue — workers start on the first
+  stale note while the walk is still running.
+- Content-addressed images: ``/images/<hash8>-<name>`` from source bytes ×
+  encoder settings; an image in the manifest is never encoded twice.
+- Pre-compiled regex: every pattern compiled once at module load.
+- Single read: source bytes are read exactly once and reused for hash + body.
+- Quiet writes: outputs and the manifest go through temp file + rename, and
+  are skipped when the bytes on disk already match — no torn files, and no
+  mtime churn to set off ``hugo server`` rebuilds.
+- Defensive: malformed YAML, missing images, and empty configs degrade
+  gracefully with a logged warning rather than aborting the whole run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import functools
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+import o2h_frontmatter
+import o2h_lex
+import o2h_search
+import o2h_taxonomy
+import o2h_util
+
+# Heavy modules are imported where first needed, so an up-to-date run never
+# pays for them: PyYAML when a header isn't flat (o2h_frontmatter), Pillow
+# when an image is planned or encoded, the process pool when one is started.
+if TYPE_CHECKING:
+    from concurrent.futures import Executor, Future
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+
+# ─── Logging ──────────────────────────────────────────────────────────────────
+
+# Shared with o2h_pdf (o2h_util), like the file helpers below.
+_Color = o2h_util.Color
+_setup_logging = o2h_util.setup_logging
+log = o2h_util.log
+_ok = o2h_util.ok
+
+
+# ─── Pre-compiled patterns (compile once, reuse forever) ──────────────────────
+
+# Front matter, fence and callout openers, fence closers: shared (o2h_lex).
+_RE_FRONTMATTER = o2h_lex.RE_FRONTMATTER
+_RE_BLOCK       = o2h_lex.RE_BLOCK
+_fence_closer   = o2h_lex.fence_closer
+_RE_WIKILINK    = re.compile(r"\[\[([^\]|]+)(?:\|([^\]]+))?\]\]")
+_RE_IMAGE       = re.compile(r"!\[([^\]]*)\]\(([^)\s]+)\)")
+# Everything the lexer rewrites inside prose: [[wikilink]] or [alt](ref), one
+# pattern with a literal "[" prefix so the regex engine can skip ahead fast.
+# An image is the second branch preceded by "!" (checked in the callback).
+_RE_LINK        = re.compile(
+    r"\[(?:\[(?P<target>[^\]|]+)(?:\|(?P<label>[^\]]+))?\]\]"
+    r"|(?P<alt>[^\]]*)\]\((?P<ref>[^)\s]+)\))"
+)
+# Callout bodies: a run of ">" lines (each iteration must consume a line, so
+# no backtracking), and the marker stripped from each: "> x" → "x", ">x" → "x".
+_RE_QUOTE_RUN   = re.compile(r"(?:>[^\n]*(?:\n|\Z))+")
+_RE_QUOTE_MARK  = re.compile(r"^(?:> |>[ \t]*)", re.MULTILINE)
+# The blank lines after a callout: the lexer emits exactly one instead.
+_RE_BLANKS      = re.compile(r"(?:[ \t]*\r?\n)*")
+# Inline code spans (`x`, ``x``): prose inside them is left literal.
+_RE_CODESPAN    = re.compile(r"(`+)[^`\n](?:[^`\n]|(?!\1)`)*?\1(?!`)")
+# "difficulty: <level>": the level itself comes from taxonomy_difficulties.
+_RE_DIFFICULTY  = re.compile(r"\bdifficulty[:\s\"']+(?=\w)", re.IGNORECASE)
+# Left by the link callback where the "!" before it must go (see _inline_repl).
+_UNBANG = "\0"
+_RE_SHORTCODE = re.compile(r"\{\{[<%].*?[%>]\}\}", re.DOTALL)
+_RE_MD_NOISE = re.compile(r"[*_`#\[\]()]+")
+_RE_MULTISPACE = re.compile(r"\s+")
+# ATX headings. The lexer only feeds it prose, so "# comment" lines in fenced
+# code never become anchors.
+_RE_HEADING = re.compile(r"^#{1,6}[ \t]+(.+?)(?:[ \t]+#+)?[ \t]*$", re.MULTILINE)
+_RE_MD_LINKTEXT = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+
+
+CALLOUT_MAP: dict[str, tuple[str, str]] = {
+    "note":     ("callout-info",    "📝"),
+    "info":     ("callout-info",    "ℹ️"),
+    "tip":      ("callout-success", "💡"),
+    "success":  ("callout-success", "✅"),
+    "warning":  ("callout-warning", "⚠️"),
+    "danger":   ("callout-danger",  "🚨"),
+    "question": ("callout-info",    "❓"),
+    "abstract": ("callout-info",    "📄"),
+    "example":  ("callout-success", "📌"),
+}
+
+# Taxonomy dictionaries, canonical name → aliases (config: taxonomy_*).
+# Tools are matched ONLY inside fenced code blocks → far fewer false positives.
+_DEFAULT_TOOLS: dict[str, Any] = {
+    **dict.fromkeys((
+        "nmap", "netcat", "wireshark", "burp", "burpsuite", "sqlmap", "msfvenom", "john",
+        "hashcat", "gobuster", "dirb", "dirbuster", "nikto", "nessus", "openvas", "hydra",
+        "aircrack-ng", "responder", "impacket", "bloodhound", "ffuf", "wfuzz", "enum4linux",
+        "smbclient", "smbmap", "rpcclient", "evil-winrm", "chisel", "ligolo", "mimikatz",
+    ), ()),
+    "metasploit":   ["msfconsole"],
+    "crackmapexec": ["cme", "nxc", "netexec"],
+}
+_DEFAULT_PLATFORMS = dict.fromkeys(("hackthebox", "tryhackme", "picoctf", "vulnhub",
+                                    "overthewire"), ())
+_DEFAULT_DIFFICULTIES = dict.fromkeys(("beginner", "intermediate", "advanced"), ())
+
+DEFAULT_CONFIG: dict[str, Any] = {
+    "obsidian_vault":               "./obsidian-vault",
+    "hugo_content":                 "./content/posts",
+    "hugo_static":                  "./static/images",
+    "obsidian_attachments_folder":  "attachments",
+    "auto_copy_images":             True,
+    "optimize_images":              True,
+    "image_max_width":              1200,
+    "image_quality":                85,
+    "image_widths":                 [480, 800, 1200],   # responsive variants (px)
+    "image_formats":                ["webp"],           # extra formats: webp, avif
+    "create_missing_frontmatter":   True,
+    "default_draft":                False,
+    "default_categories":           ["General"],
+    "auto_extract_tools":           True,
+    "auto_extract_platforms":       True,
+    "auto_extract_difficulty":      True,
+    "taxonomy_tools":               _DEFAULT_TOOLS,
+    "taxonomy_platforms":           _DEFAULT_PLATFORMS,
+    "taxonomy_difficulties":        _DEFAULT_DIFFICULTIES,
+    "generate_description":         True,
+    "cache_dir":                    ".cache/o2h",
+    "max_workers":                  0,   # 0 = auto (cpu_count, capped at job count)
+    "queue_depth":                  0,   # 0 = auto (4 × workers) decoded notes in flight
+    "executor":                     "auto",  # thread | process | auto
+    "image_workers":                0,   # 0 = auto (half the cores) concurrent encodes
+    "image_executor":               "thread",  # thread | process
+    "prune":                        "on",  # on | off | dry-run: delete what removed notes left
+    "backlinks_file":               "./data/backlinks.json",  # "" = don't write
+    "search_index_dir":             "./static/search-index",  # "" = don't write
+}
+
+
+# Bump whenever a change to this file can alter output for the same input:
+# every manifest entry stamped with an older version is reconverted.
+__version__ = "3.8.3"
+
+# Front-matter lists `o2h stats` breaks notes down by.
+STATS_TAXONOMIES = ("categories", "tags", "tools", "platforms", "difficulties")
+
+# Settings that change the bytes of an encoded image (part of its address).
+_ENCODE_KEYS = ("optimize_images", "image_max_width", "image_quality")
+# Keys a note depends on as soon as it embeds a local image: they decide how
+# the reference resolves, how the copied file is encoded, and the markup.
+_IMAGE_KEYS = ("obsidian_attachments_folder", *_ENCODE_KEYS,
+               "image_widths", "image_formats")
+
+_ENCODABLE = frozenset({".jpg", ".jpeg", ".png"})
+# Extra variant formats → Pillow encoder (served through <picture><source>).
+_VARIANT_FORMATS = {"webp": "WEBP", "avif": "AVIF"}
+
+
+# ─── Config loader ────────────────────────────────────────────────────────────
+
+def load_config(path: str | Path) -> dict[str, Any]:
+    cfg = DEFAULT_CONFIG.copy()
+    p = Path(path)
+    if p.is_file():
+        try:
+            # Flat, like most headers: the YAML library is rarely needed.
+            user = o2h_frontmatter.load(p.read_text(encoding="utf-8")) or {}
+            if isinstance(user, dict):
+                cfg.update(user)
+            else:
+                log.warning(f"{p} did not parse to a mapping — ignoring")
+        except o2h_frontmatter.Error as e:
+            log.warning(f"Bad YAML in {p}: {e} — using defaults")
+    return cfg
+
+
+# ─── Incremental cache (stat + SHA-1 manifest) ────────────────────────────────
+
+# Files modified this recently may still change within the filesystem's mtime
+# granularity (1-2 s on FAT/HFS+/some network mounts). Their stat tuple is not
+# trusted, so the next run hashes them again — git's "racy clean" rule.
+_RACY_NS = 2_000_000_000
+
+
+_stat_key = o2h_util.stat_key
+
+
+@dataclass
+class Cache:
+    """Per-source manifest.
+
+    ``files[rel_path]`` records what one output was built from:
+
+    - ``sha1`` / ``st``: source digest and ``[size, mtime_ns, ino]``. A matching
+      ``st`` skips the file unopened; the SHA-1 is only consulted when the stat
+      tuple moved (touch, checkout, copy).
+    - ``keys`` / ``cfg``: the config keys the conversion actually read, and a
+      fingerprint of their values — so a config edit only invalidates notes
+      that depend on the edited keys.
+    - ``ver``: converter ``__version__`` that produced the output.
+    - ``out``: ``{"sha1", "st"}`` of the written output, so hand edits and
+      deletions in content/ are detected and repaired.
+    - ``ident``: what wikilinks can match the note by — URL, title, aliases,
+      heading anchors (see ``LinkIndex``).
+    - ``links``: ``{target: href}`` for every wikilink the note contains, as
+      resolved when it was written (``null``: matched no note).
+    - ``meta``: body word count and taxonomy lists (categories, tags, tools,
+      platforms, difficulties) — what ``o2h stats`` reports from.
+
+    Images are content-addressed (see ``Converter._copy_image``):
+
+    - ``images[content_key]``: ``{"name", "src", "w", "h", "bytes"}`` — the
+      static/ file produced from source digest ``src`` under the current
+      encoder settings, with its dimensions and size.
+    - ``sources[abs_path]``: ``{"sha1", "st"}`` of each image source, so an
+      unchanged image is not even re-read.
+    """
+
+    path: Path
+    entries: dict[str, dict[str, Any]] = field(default_factory=dict)
+    images: dict[str, dict[str, Any]] = field(default_factory=dict)
+    sources: dict[str, dict[str, Any]] = field(default_factory=dict)
+    dirty: bool = False
+    digest: str = ""   # SHA-1 of the manifest bytes on disk, as loaded or saved
+
+    VERSION = 3
+
+    @classmethod
+    def load(cls, cache_file: Path) -> "Cache":
+        if cache_file.is_file():
+            try:
+                blob = cache_file.read_bytes()
+                raw = json.loads(blob)
+            except (json.JSONDecodeError, UnicodeDecodeError, OSError) as e:
+                log.debug(f"cache load failed ({e}) — fresh start")
+            else:
+                if isinstance(raw, dict) and raw.get("version") == cls.VERSION:
+                    return cls(path=cache_file, entries=raw.get("files", {}),
+                               images=raw.get("images", {}),
+                               sources=raw.get("sources", {}), digest=_sha1(blob))
+                if isinstance(raw, dict) and raw.get("version") == 2:
+                    # v2 named images after their source file; those names are
+                    # gone, so keep the notes and let images re-register.
+                    return cls(path=cache_file, entries=raw.get("files", {}), dirty=True)
+                if isinstance(raw, dict):
+                    # v1 manifest: flat {rel_path: sha1}. Keep the digests so an
+                    # upgrade costs one hashing pass, not a full reconversion.
+                    return cls(path=cache_file, dirty=True, entries={
+                        k: {"sha1": v} for k, v in raw.items() if isinstance(v, str)
+                    })
+        return cls(path=cache_file)
+
+    def save(self) -> None:
+        """Write the manifest atomically — and not at all if its bytes are unchanged."""
+        # Compact JSON keeps the manifest tiny on disk.
+        blob = json.dumps(
+            {"version": self.VERSION, "files": self.entries, "images": self.images,
+             "sources": self.sources},
+            separators=(",", ":"),
+        ).encode()
+        digest = _sha1(blob)
+        if digest != self.digest or not self.path.is_file():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(self.path, lambda t: t.write_bytes(blob))
+            self.digest = digest
+        self.dirty = False
+
+    def stat_matches(self, key: str, st: os.stat_result) -> bool:
+        e = self.entries.get(key)
+        return e is not None and e.get("st") == _stat_key(st)
+
+    def is_unchanged(self, key: str, digest: str) -> bool:
+        e = self.entries.get(key)
+        return e is not None and e.get("sha1") == digest
+
+    @staticmethod
+    def make_entry(digest: str, st: os.stat_result) -> dict[str, Any]:
+        entry: dict[str, Any] = {"sha1": digest}
+        if st.st_mtime_ns < time.time_ns() - _RACY_NS:
+            entry["st"] = _stat_key(st)
+        return entry
+
+
+def _fingerprint(cfg: dict[str, Any], keys: Iterable[str]) -> str:
+    blob = json.dumps({k: cfg.get(k) for k in keys}, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+_sha1 = o2h_util.sha1
+
+
+def _content_key(digest: str, image_fp: str) -> str:
+    """Address of one encoded image: source bytes × encoder settings."""
+    return _sha1(f"{digest}:{image_fp}".encode())
+
+
+_write_atomic = o2h_util.write_atomic
+_write_if_changed = o2h_util.write_if_changed
+
+
+def _image_size(path: Path) -> tuple[int, int] | None:
+    """Pixel size from the header alone; None for formats Pillow can't read (SVG)."""
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None
+
+
+# ─── Profiling (--profile) ────────────────────────────────────────────────────
+#
+# Stages are wrapped in ``with _span(stage, file):``. With no profiler that is
+# a global lookup and a shared nullcontext — nothing is timed or allocated.
+
+class Profiler:
+    """Wall + CPU time per (file, stage), exported as Chrome trace events."""
+
+    def __init__(self) -> None:
+        self.t0 = time.perf_counter_ns()
+        # (stage, file, pid, tid, start_ns, wall_ns, cpu_ns). perf_counter is
+        # CLOCK_MONOTONIC, shared by the worker processes that send theirs in.
+        self.spans: list[tuple[str, str, int, int, int, int, int]] = []
+
+    def write_trace(self, path: Path) -> None:
+        """Trace-event JSON: open in ui.perfetto.dev or chrome://tracing."""
+        events = [
+            {"name": stage, "cat": "o2h", "ph": "X", "pid": pid, "tid": tid,
+             "ts": (start - self.t0) / 1000, "dur": wall / 1000,
+             "args": {"file": file, "cpu_ms": round(cpu / 1e6, 3)}}
+            for stage, file, pid, tid, start, wall, cpu in self.spans
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+    def report(self, top: int) -> None:
+        """Slowest files (all their stages) and the per-stage totals."""
+        files: dict[str, list[int]] = {}
+        stages: dict[str, list[int]] = {}
+        for stage, file, _, _, _, wall, cpu in self.spans:
+            s = stages.setdefault(stage, [0, 0, 0])
+            s[0] += wall
+            s[1] += cpu
+            s[2] += 1
+            if stage not in _NESTED:
+                f = files.setdefault(file, [0, 0])
+                f[0] += wall
+                f[1] += cpu
+        log.info(f"Top {top} stages (wall / cpu / count):")
+        for stage, (wall, cpu, n) in sorted(stages.items(), key=lambda s: -s[1][0])[:top]:
+            log.info(f"  {stage:<20} {wall / 1e6:>9.1f}ms {cpu / 1e6:>9.1f}ms {n:>7}")
+        log.info(f"Top {top} files (wall / cpu):")
+        for file, (wall, cpu) in sorted(files.items(), key=lambda f: -f[1][0])[:top]:
+            log.info(f"  {wall / 1e6:>9.1f}ms {cpu / 1e6:>9.1f}ms  {file}")
+
+
+# Stages that run inside another recorded stage ("convert"): left out of the
+# per-file totals so nothing is counted twice.
+_NESTED = frozenset({"split_frontmatter", "render_body", "image", "fill_frontmatter",
+                     "render_frontmatter", "search", "write"})
+
+
+class _Span:
+    __slots__ = ("p", "stage", "file", "w0", "c0")
+
+    def __init__(self, p: Profiler, stage: str, file: str):
+        self.p, self.stage, self.file = p, stage, file
+
+    def __enter__(self) -> None:
+        self.w0 = time.perf_counter_ns()
+        self.c0 = time.thread_time_ns()
+
+    def __exit__(self, *exc) -> None:
+        self.p.spans.append((self.stage, self.file, os.getpid(), threading.get_native_id(),
+                             self.w0, time.perf_counter_ns() - self.w0,
+                             time.thread_time_ns() - self.c0))
+
+
+_profiler: Profiler | None = None
+_NO_SPAN = contextlib.nullcontext()
+
+
+def _span(stage: str, file: str = ""):
+    return _NO_SPAN if _profiler is None else _Span(_profiler, stage, file)
+
+
+# ─── Image encoding ───────────────────────────────────────────────────────────
+
+@dataclass
+class ImageJob:
+    """One planned encode: the fallback (if ``main``) and missing variants."""
+    src: Path
+    ck: str
+    digest: str
+    name: str
+    optimize: bool
+    main: bool
+    variants: tuple[tuple[str, int, str], ...]
+    known: dict[str, Any]
+
+
+def _encode_image(cfg: dict[str, Any], dest_root: Path,
+                  job: ImageJob) -> tuple[tuple[int, int] | None, dict[str, int], int, int]:
+    """Decode ``job.src`` once; write what ``job`` asks for.
+
+    Returns the fallback's dimensions, ``{variant: bytes}``, the fallback's
+    size and the source's size. Module-level so a process pool can run it.
+    """
+    src = job.src
+    dest = dest_root / job.name
+    dest_root.mkdir(parents=True, exist_ok=True)
+    src_bytes = src.stat().st_size
+    if not job.optimize:
+        _write_atomic(dest, lambda t: shutil.copy2(src, t))
+        return _image_size(src), {}, dest.stat().st_size, src_bytes
+
+    from PIL import Image
+
+    made: dict[str, int] = {}
+    try:
+        with Image.open(src) as img:
+            ext = src.suffix.lower()
+            jpeg = ext in (".jpg", ".jpeg")
+
+            # Resize only when wider than the configured cap.
+            mw = int(cfg["image_max_width"])
+            if img.width > mw:
+                h = round(img.height * mw / img.width)
+                if jpeg:
+                    # libjpeg decodes straight at 1/2, 1/4 or 1/8 scale (never
+                    # below the target): a 4K screenshot is never fully inflated.
+                    img.draft("RGB", (mw, h))
+                # reducing_gap: integer-factor reduce() first, LANCZOS for the rest.
+                img = img.resize((mw, h), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            if jpeg and img.mode != "RGB":
+                img = img.convert("RGB")
+
+            q = int(cfg["image_quality"])
+            if job.main:
+                if jpeg:
+                    _write_atomic(dest, lambda t: img.save(t, "JPEG", quality=q, optimize=True))
+                else:
+                    # Preserve transparency for PNGs — never silently re-encode as JPEG.
+                    _write_atomic(dest, lambda t: img.save(t, "PNG", optimize=True))
+
+            # Narrower variants come from the capped image, not the original:
+            # same decode, and LANCZOS over fewer pixels.
+            base = img
+            if job.variants and img.mode not in ("RGB", "RGBA"):
+                alpha = "A" in img.mode or "transparency" in img.info
+                base = img.convert("RGBA" if alpha else "RGB")
+            for vname, w, fmt in job.variants:
+                im = base if w == base.width else base.resize(
+                    (w, max(1, round(base.height * w / base.width))), Image.Resampling.LANCZOS)
+                if not fmt:
+                    fmt_name, opts = ("JPEG", {"quality": q, "optimize": True}) if jpeg \
+                        else ("PNG", {"optimize": True})
+                else:
+                    fmt_name, opts = _VARIANT_FORMATS[fmt], {"quality": q}
+                try:
+                    _write_atomic(dest_root / vname, lambda t: im.save(t, fmt_name, **opts))
+                except Exception as e:
+                    log.warning(f"Variant failed ({vname}): {e}")
+                    continue
+                made[vname] = (dest_root / vname).stat().st_size
+            size = img.size
+    except Exception as e:
+        if not job.main:
+            log.warning(f"Variants failed ({src.name}): {e}")
+            return None, made, 0, src_bytes
+        log.warning(f"Optimize failed ({src.name}): {e} — copying raw")
+        _write_atomic(dest, lambda t: shutil.copy2(src, t))
+        size = _image_size(src)
+    return size, made, dest.stat().st_size if job.main else 0, src_bytes
+
+
+def _encode_traced(cfg: dict[str, Any], dest_root: Path, job: ImageJob) -> tuple:
+    with _span("encode", job.name):
+        return _encode_image(cfg, dest_root, job)
+
+
+class ImagePool:
+    """Image encodes on their own pool, off the text workers' critical path.
+
+    Text workers only plan an image (its names and srcsets follow from the
+    content key and the header), hand the job over and write their markdown;
+    ``close`` waits for the encodes. A worker holds one decoded image at a
+    time, so ``image_workers`` also bounds image memory.
+    """
+
+    def __init__(self, cfg: dict[str, Any], record, workers: int, processes: bool = False):
+        self._cfg = cfg
+        self._root = Path(cfg["hugo_static"]).resolve()
+        self._record = record
+        self._workers = workers
+        self._processes = processes
+        self._pool = None   # started by the first submit: most runs encode nothing
+        self._lock = threading.Lock()
+        self._seen: set[str] = set()
+        self.encoded = self.variants = self.failed = 0
+        self.saved = 0
+
+    def submit(self, job: ImageJob) -> None:
+        with self._lock:
+            # Same name ⇒ same bytes and settings: one encode per run.
+            if job.name in self._seen:
+                return
+            self._seen.add(job.name)
+            if self._pool is None:
+                self._pool = self._start()
+        fut = self._pool.submit(_encode_traced, self._cfg, self._root, job)
+        fut.add_done_callback(lambda f, j=job: self._done(j, f))
+
+    def _done(self, job: ImageJob, fut: Future) -> None:
+        exc = fut.exception()
+        if exc is not None:
+            log.error(f"image {job.src.name}: {exc}")
+            with self._lock:
+                self.failed += 1
+            return
+        result = fut.result()
+        self._record(job, result)
+        _, made, main_bytes, src_bytes = result
+        with self._lock:
+            self.variants += len(made)
+            if job.main:
+                self.encoded += 1
+                self.saved += src_bytes - main_bytes
+        log.debug(f"image: {job.src.name} → {job.name} (+{len(made)} variant(s))")
+
+    def _start(self) -> Executor:
+        if self._processes:
+            from concurrent.futures import ProcessPoolExecutor
+
+            return ProcessPoolExecutor(max_workers=self._workers, initializer=_setup_logging,
+                                       initargs=(log.isEnabledFor(logging.DEBUG),))
+        from concurrent.futures import ThreadPoolExecutor
+
+        return ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="o2h-img")
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "ImagePool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _peak_rss_mib() -> float | None:
+    """Peak RSS of this process and its reaped children, or None off Unix."""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _human(n: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GiB"
+
+
+# ─── Link index ───────────────────────────────────────────────────────────────
+
+def _norm_name(s: str) -> str:
+    """How Obsidian compares link text to names: case- and spacing-blind."""
+    return _RE_MULTISPACE.sub(" ", s.strip()).lower()
+
+
+def _urlize(path: str) -> str:
+    """Hugo's path sanitiser: lower-case, " " → "-", URL-unsafe characters dropped."""
+    return "".join("-" if ch == " " else ch for ch in path.lower()
+                   if ch.isalnum() or ch in " ./_-~+")
+
+
+def _anchor(heading: str) -> str:
+    """Heading id as Hugo's goldmark renderer derives it (github style)."""
+    text = _RE_MD_LINKTEXT.sub(r"\1", heading).strip().lower()
+    return "".join(ch if ch.isalnum() or ch == "_" else "-"
+                   for ch in text if ch.isalnum() or ch in " -_")
+
+
+def _flag(value: Any) -> bool:
+    """A front-matter flag (``draft``) as Hugo reads it: the strings "false",
+    "0", "f" are false, where Python's ``bool`` would call them true.
+    """
+    if isinstance(value, str):
+        return value in ("1", "t", "T", "TRUE", "true", "True")
+    return bool(value)
+
+
+def _note_url(rel_key: str, fm: dict) -> str:
+    """Page URL Hugo gives a converted note (front-matter url / slug honoured)."""
+    url = fm.get("url")
+    if isinstance(url, str) and url.strip("/"):
+        return f"/{url.strip('/')}/"
+    folder, _, stem = _output_rel(rel_key)[:-3].rpartition("/")
+    slug = fm.get("slug")
+    if isinstance(slug, str) and slug.strip():
+        stem = slug.strip()
+    return f"/posts/{_urlize(f'{folder}/{stem}' if folder else stem)}/"
+
+
+class LinkIndex:
+    """Vault-wide wikilink resolution: note names → output URLs.
+
+    ``notes[rel_key]`` is a note's identity as its last conversion recorded it
+    — ``{"url", "title", "aliases", "heads", "draft"}`` — or only its default
+    URL for a note the walk found but nobody has converted yet. Resolving a
+    link never opens another note. Lookup order follows Obsidian: vault path,
+    then file name (the shallowest path wins a tie), then alias; the
+    front-matter title is the last resort.
+
+    The reverse side — which notes link by which name — is kept too, so an
+    identity change re-renders exactly the notes that might see it.
+    """
+
+    _TABLES = ("path", "name", "alias", "title")
+
+    def __init__(self) -> None:
+        self.notes: dict[str, dict[str, Any]] = {}
+        self._names: dict[str, dict[str, set[str]]] = {t: {} for t in self._TABLES}
+        self._urls: dict[str, str] = {}   # url → rel_key
+        self._refs: dict[str, set[str]] = {}        # name → notes linking by it
+        self._out: dict[str, dict[str, Any]] = {}   # rel_key → its "links"
+
+    @staticmethod
+    def _keys(rel_key: str, ident: dict[str, Any]) -> Iterator[tuple[str, str]]:
+        path = rel_key[:-3]
+        yield "path", _norm_name(path)
+        yield "name", _norm_name(path.rpartition("/")[2])
+        for alias in ident.get("aliases", ()):
+            yield "alias", _norm_name(alias)
+        if ident.get("title"):
+            yield "title", _norm_name(ident["title"])
+
+    def add(self, rel_key: str, ident: dict[str, Any] | None = None) -> None:
+        """Index ``rel_key`` under ``ident`` (default: its file name only)."""
+        self.remove(rel_key)
+        ident = ident or {"url": _note_url(rel_key, {})}
+        self.notes[rel_key] = ident
+        for table, name in self._keys(rel_key, ident):
+            self._names[table].setdefault(name, set()).add(rel_key)
+        self._urls[ident["url"]] = rel_key
+
+    def remove(self, rel_key: str) -> None:
+        ident = self.notes.pop(rel_key, None)
+        if ident is None:
+            return
+        for table, name in self._keys(rel_key, ident):
+            keys = self._names[table].get(name)
+            if keys is not None:
+                keys.discard(rel_key)
+                if not keys:
+                    del self._names[table][name]
+        if self._urls.get(ident["url"]) == rel_key:
+            del self._urls[ident["url"]]
+
+    def lookup(self, page: str) -> str | None:
+        """rel_key of the note ``[[page]]`` means, or None."""
+        name = _norm_name(page).strip("/")
+        if name.endswith(".md"):
+            name = name[:-3]
+        if "/" in name:
+            hits = self._names["path"].get(name)
+            if not hits:
+                # [[folder/note]] may name any unambiguous tail of the path.
+                tail = "/" + name
+                hits = {k for k in self._names["name"].get(name.rpartition("/")[2], ())
+                        if _norm_name(k[:-3]).endswith(tail)}
+        else:
+            hits = (self._names["name"].get(name) or self._names["alias"].get(name)
+                    or self._names["title"].get(name))
+        if not hits:
+            return None
+        return min(hits, key=lambda k: (k.count("/"), k))
+
+    def resolve(self, target: str) -> str | None:
+        """href for ``note``, ``dir/note``, ``note#Heading`` or ``#Heading``.
+
+        None when no note matches. Block references (``#^id``) link to the
+        page; nested heading paths (``#A#B``) to their last heading.
+        """
+        page, _, frag = target.partition("#")
+        url = ""
+        if page.strip():
+            key = self.lookup(page)
+            if key is None:
+                return None
+            url = self.notes[key]["url"]
+        frag = frag.rpartition("#")[2].strip()
+        if not frag or frag.startswith("^"):
+            return url or "#"
+        return f"{url}#{_anchor(frag)}"
+
+    def key_for(self, url: str) -> str | None:
+        return self._urls.get(url)
+
+    @staticmethod
+    def _page(target: str) -> str:
+        """The name a link looks notes up by: ``dir/Note.md#H`` → ``note``."""
+        page = target.partition("#")[0].strip().strip("/").rpartition("/")[2]
+        return _norm_name(page[:-3] if page.lower().endswith(".md") else page)
+
+    def set_links(self, rel_key: str, links: dict[str, Any] | None) -> None:
+        """Record the links ``rel_key`` was written with (None: it's gone)."""
+        old = self._out.get(rel_key)
+        if old is links:
+            return
+        for target in old or ():
+            refs = self._refs.get(self._page(target))
+            if refs is not None:
+                refs.discard(rel_key)
+        if links:
+            self._out[rel_key] = links
+            for target in links:
+                self._refs.setdefault(self._page(target), set()).add(rel_key)
+        else:
+            self._out.pop(rel_key, None)
+
+    def dependents(self, rel_key: str, old: dict[str, Any] | None = None) -> set[str]:
+        """Notes with a link that did or could resolve to ``rel_key``.
+
+        ``old`` is its previous identity: links by a name it has just lost
+        depend on it as much as links by its new names.
+        """
+        names = {n for t, n in self._keys(rel_key, self.notes.get(rel_key, {})) if t != "path"}
+        if old is not None:
+            names.update(n for t, n in self._keys(rel_key, old) if t != "path")
+        deps: set[str] = set()
+        for name in names:
+            deps.update(self._refs.get(name, ()))
+        return deps
+
+
+# ─── Converter core ───────────────────────────────────────────────────────────
+
+@dataclass
+class Note:
+    """Per-file conversion context: what one conversion depended on."""
+    src: Path
+    key: str = ""                                   # vault-relative path
+    cfg_keys: set[str] = field(default_factory=set)
+    images: set[str] = field(default_factory=set)   # static/images names embedded
+    links: dict[str, str | None] = field(default_factory=dict)  # target → href
+    heads: list[str] = field(default_factory=list)  # heading texts, in order
+    ident: dict[str, Any] | None = None             # what links to it match
+    search: dict[str, Any] | None = None            # o2h_search document; None if draft
+    meta: dict[str, Any] | None = None              # word count + taxonomies (o2h stats)
+
+
+@dataclass(frozen=True)
+class Published:
+    """One image as notes embed it: the fallback file plus its srcsets."""
+    name: str
+    srcset: str = ""                            # source format: "url 480w, …"
+    sources: tuple[tuple[str, str], ...] = ()   # (format, srcset) for <picture>
+
+
+class Converter:
+    """Stateless transforms + a thread-safe, content-addressed image store."""
+
+    def __init__(self, config: dict[str, Any],
+                 images: dict[str, dict[str, Any]] | None = None,
+                 sources: dict[str, dict[str, Any]] | None = None,
+                 links: LinkIndex | None = None):
+        self.cfg = config
+        self.attach_name = config["obsidian_attachments_folder"]
+        self.image_dest_root = Path(config["hugo_static"]).resolve()
+        self._images_done: dict[Path, Published] = {}
+        self._images_lock = threading.Lock()
+        # Persistent image manifest (Cache.images / Cache.sources), shared by
+        # reference so the Build saves whatever this Converter learned.
+        self.images: dict[str, dict[str, Any]] = images if images is not None else {}
+        self.sources: dict[str, dict[str, Any]] = sources if sources is not None else {}
+        # Read-only while notes convert; the Build refreshes it between passes.
+        self.links = links if links is not None else LinkIndex()
+        self._image_fp = _fingerprint(config, _ENCODE_KEYS)
+        self._widths = sorted({int(w) for w in config.get("image_widths") or ()})
+        self._matchers: dict[str, o2h_taxonomy.Matcher] = {}
+        # Where planned encodes go: inline by default; a Build points this at
+        # its ImagePool, a worker process at a list it hands back.
+        self.encode = self.encode_now
+
+    def _opt(self, note: Note | None, key: str) -> Any:
+        """Config lookup that records the dependency on ``key`` for ``note``."""
+        if note is not None:
+            note.cfg_keys.add(key)
+        return self.cfg[key]
+
+    def _taxonomy(self, note: Note | None, key: str) -> o2h_taxonomy.Matcher:
+        """The ``taxonomy_*`` dictionary ``key``, compiled on first use."""
+        entries = self._opt(note, key)
+        m = self._matchers.get(key)
+        if m is None:
+            if not isinstance(entries, dict):
+                log.warning(f"{key}: expected a mapping of name → aliases — ignored")
+                entries = {}
+            m = self._matchers[key] = o2h_taxonomy.Matcher(entries)
+        return m
+
+    # ─── Front matter ────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _split_frontmatter(text: str) -> tuple[dict, str]:
+        m = _RE_FRONTMATTER.match(text)
+        if not m:
+            return {}, text
+        try:
+            fm = o2h_frontmatter.load(m.group(1)) or {}
+        except o2h_frontmatter.Error as e:
+            log.warning(f"Malformed front matter — keeping body, dropping fm: {e}")
+            return {}, text[m.end():]
+        return fm if isinstance(fm, dict) else {}, text[m.end():]
+
+    @staticmethod
+    def _title_from_filename(stem: str) -> str:
+        return o2h_util.title_from_filename(stem)
+
+    def _fill_frontmatter(self, fm: dict, src: Path, body: str,
+                          note: Note | None = None, code: list[str] | None = None) -> dict:
+        if not self._opt(note, "create_missing_frontmatter"):
+            return dict(fm)
+
+        fm = dict(fm)
+        fm.setdefault("title", self._title_from_filename(src.stem))
+
+        if "date" not in fm:
+            ts = src.stat().st_mtime
+            fm["date"] = datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        if "draft" not in fm:
+            fm["draft"] = self._opt(note, "default_draft")
+        if "categories" not in fm:
+            fm["categories"] = list(self._opt(note, "default_categories"))
+
+        if "difficulties" not in fm and self._opt(note, "auto_extract_difficulty"):
+            levels = self._taxonomy(note, "taxonomy_difficulties")
+            for m in _RE_DIFFICULTY.finditer(body):
+                level = levels.at(body, m.end())
+                if level:
+                    fm["difficulties"] = [level]
+                    break
+
+        if "platforms" not in fm and self._opt(note, "auto_extract_platforms"):
+            plats = self._taxonomy(note, "taxonomy_platforms").find(body)
+            if plats:
+                fm["platforms"] = sorted(plats)
+
+        if "tools" not in fm and self._opt(note, "auto_extract_tools"):
+            # Tools harvested ONLY from inside fenced code → no prose noise.
+            if code is None:
+                code = self.render_body(body, src.parent)[1]
+            # All blocks in one scan; "\n" keeps names from joining across them.
+            tools = self._taxonomy(note, "taxonomy_tools").find("\n".join(code))
+            if tools:
+                fm["tools"] = sorted(tools)
+
+        if "description" not in fm and self._opt(note, "generate_description"):
+            for para in body.split("\n\n"):
+                p = para.strip()
+                if not p or p.startswith(("#", "<", ">", "```", "---", "{{")):
+                    continue
+                cleaned = _RE_MD_NOISE.sub("", _RE_SHORTCODE.sub("", p))
+                cleaned = _RE_MULTISPACE.sub(" ", cleaned).strip()
+                if cleaned:
+                    fm["description"] = cleaned[:157] + "..." if len(cleaned) > 160 else cleaned
+                    break
+
+        return fm
+
+    # ─── Body lexer (one pass, code-fence aware) ─────────────────────────────
+    #
+    # The body is cut once into prose / fenced-code / callout segments:
+    #   - _RE_BLOCK jumps straight to the next fence opener or callout header,
+    #     so prose between them is never looked at twice;
+    #   - fenced code is copied verbatim (no wikilink/image rewriting inside
+    #     command examples), gets its copy marker and is handed back for tool
+    #     extraction;
+    #   - a callout's ">" run is taken in one anchored match and its stripped
+    #     body re-lexed, which handles nesting and code inside callouts;
+    #   - each prose run gets ONE _RE_LINK.sub covering images and wikilinks,
+    #     skipped outright when the run has no "[", split around inline code
+    #     spans only when it has a backtick.
+
+    def _wikilink(self, target: str, label: str | None, note: Note | None = None) -> str:
+        target = target.strip()
+        label = (label or target).strip()
+        href = self.links.resolve(target)
+        if note is not None:
+            note.links[_norm_name(target)] = href
+        if href is None:
+            # No such note (yet): the slug is where a note of that name lands.
+            log.debug(f"{note.src.name if note else '?'}: [[{target}]] matches no note")
+            href = "/posts/" + _RE_MULTISPACE.sub("-", target).lower().replace("_", "-") + "/"
+        return f"[{label}]({href})"
+
+    def transform_wikilinks(self, text: str) -> str:
+        return _RE_WIKILINK.sub(lambda m: self._wikilink(m.group(1), m.group(2)), text)
+
+    def _inline_repl(self, src_dir: Path, note: Note | None):
+        copy_images = self._opt(note, "auto_copy_images")
+
+        def repl(m: re.Match) -> str:
+            if m.group("target") is not None:
+                return self._wikilink(m.group("target"), m.group("label"), note)
+            st = m.start()
+            if copy_images and st and m.string[st - 1] == "!":
+                pub = self._image(m.group("ref"), src_dir, note)
+                if pub:
+                    md = self._embed(m.group("alt"), pub)
+                    # The "!" sits outside the match: keep it for a plain
+                    # image, have _prose drop it in front of a shortcode.
+                    return md[1:] if md[0] == "!" else _UNBANG + md
+            return m.group(0)
+
+        return repl
+
+    @staticmethod
+    def _prose(text: str, repl) -> str:
+        if "[" not in text:
+            return text
+        if "`" not in text:
+            text = _RE_LINK.sub(repl, text)
+        else:
+            out: list[str] = []
+            pos = 0
+            for m in _RE_CODESPAN.finditer(text):
+                out.append(_RE_LINK.sub(repl, text[pos:m.start()]))
+                out.append(m.group(0))
+                pos = m.end()
+            out.append(_RE_LINK.sub(repl, text[pos:]))
+            text = "".join(out)
+        return text.replace("!" + _UNBANG, "") if _UNBANG in text else text
+
+    def _lex(self, text: str, repl, code: list[str],
+             heads: list[str] | None = None) -> str:
+        out: list[str] = []
+        pos = scan = 0
+        while True:
+            m = _RE_BLOCK.search(text, scan)
+            if m is None:
+                if heads is not None and "#" in text[pos:]:
+                    heads.extend(_RE_HEADING.findall(text, pos))
+                out.append(self._prose(text[pos:], repl))
+                break
+
+            fence, info, kind = m.group("fence"), m.group("info"), m.group("kind")
+            if fence and o2h_lex.inline_fence(fence, info):
+                scan = m.end()
+                continue
+            if kind and not m.group(0).endswith("\n"):
+                scan = m.end()
+                continue
+
+            if heads is not None and "#" in text[pos:m.start()]:
+                heads.extend(_RE_HEADING.findall(text, pos, m.start()))
+            out.append(self._prose(text[pos:m.start()], repl))
+
+            if fence:
+                close = _fence_closer(fence).search(text, m.end())
+                if close is None:
+                    # Unclosed fence runs to the end of the note (CommonMark).
+                    code.append(text[m.end():])
+                    out.append(text[m.start():])
+                    return "".join(out)
+                code.append(text[m.end():close.start()])
+                out.append(text[m.start():close.end()])
+                out.append("\n\n<!-- COPY_BUTTON -->")
+                pos = scan = close.end()
+                continue
+
+            # Callout: header + the run of following lines that start with ">".
+            run = _RE_QUOTE_RUN.match(text, m.end())
+            end = run.end() if run else m.end()
+            inner = _RE_QUOTE_MARK.sub("", run.group(0)) if run else ""
+            out.append(self._callout(kind, m.group("title"), inner, repl, code))
+            if end < len(text):
+                # goldmark ends the "<div>" HTML block only at a blank line:
+                # without one, a fence or heading after it stays raw text.
+                out.append("\n\n")
+                end = _RE_BLANKS.match(text, end).end()
+            pos = scan = end
+
+        return "".join(out)
+
+    def _callout(self, kind: str, title: str, inner: str, repl, code: list[str]) -> str:
+        kind = kind.lower()
+        title = self._prose(title.strip(), repl)
+        cls, icon = CALLOUT_MAP.get(kind, ("callout-info", "📄"))
+        if not title:
+            title = f"{icon} {kind.capitalize()}"
+        body = self._lex(inner, repl, code).rstrip()
+        return (
+            f'<div class="callout {cls}">\n'
+            f'<div class="callout-title">{title}</div>\n\n'
+            f"{body}\n"
+            f"</div>"
+        )
+
+    def render_body(self, body: str, src_dir: Path,
+                    note: Note | None = None) -> tuple[str, list[str]]:
+        """Apply every body transform in one pass; return (body, code blocks)."""
+        code: list[str] = []
+        heads = note.heads if note is not None else None
+        return self._lex(body, self._inline_repl(src_dir, note), code, heads), code
+
+    # ─── Images ──────────────────────────────────────────────────────────────
+
+    def transform_images(self, text: str, src_dir: Path, note: Note | None = None) -> str:
+        if not self._opt(note, "auto_copy_images"):
+            return text
+        def repl(m: re.Match) -> str:
+            pub = self._image(m.group(2), src_dir, note)
+            return self._embed(m.group(1), pub) if pub else m.group(0)
+
+        return _RE_IMAGE.sub(repl, text)
+
+    def _image(self, ref: str, src_dir: Path, note: Note | None) -> Published | None:
+        """Publish a local image ref into static/, or None to keep the ref as is."""
+        if ref.startswith(("http://", "https://", "/")):
+            return None
+        if note is not None:
+            # Local image: its resolution and encoding both read config.
+            note.cfg_keys.update(_IMAGE_KEYS)
+
+        attach = self.attach_name
+        tail = ref[len(attach) + 1:] if ref.startswith(attach + "/") else ref
+        for cand in (
+            src_dir / ref,
+            src_dir / attach / tail,
+            src_dir.parent / attach / tail,
+        ):
+            if cand.is_file():
+                with _span("image", note.key if note else ref):
+                    pub = self._copy_image(cand.resolve())
+                if note is not None:
+                    note.images.add(pub.name)
+                return pub
+
+        log.warning(f"Image not found: {ref} (relative to {src_dir})")
+        return None
+
+    @staticmethod
+    def _embed(alt: str, pub: Published) -> str:
+        """Markdown for a published image: plain, or the image shortcode with srcsets."""
+        url = f"/images/{pub.name}"
+        if not pub.srcset and not pub.sources:
+            return f"![{alt}]({url})"
+        alt = alt.replace("\\", "\\\\").replace('"', '\\"')
+        attrs = [f'src="{url}"', f'alt="{alt}"']
+        if pub.srcset:
+            attrs.append(f'srcset="{pub.srcset}"')
+        attrs.extend(f'{fmt}="{srcset}"' for fmt, srcset in pub.sources)
+        return f"{{{{< image {' '.join(attrs)} >}}}}"
+
+    def _source_digest(self, src: Path) -> str:
+        """SHA-1 of an image source, from the stat memo when it still matches."""
+        key = str(src)
+        st = src.stat()
+        rec = self.sources.get(key)
+        if rec is not None and rec.get("st") == _stat_key(st):
+            return rec["sha1"]
+        digest = _sha1(src.read_bytes())
+        with self._images_lock:
+            self.sources[key] = Cache.make_entry(digest, st)
+        return digest
+
+    def _copy_image(self, src: Path) -> Published:
+        """Publish ``src`` under its content address.
+
+        The fallback file is ``<hash8>-<src.name>``, hashing the source bytes
+        together with the encoder settings: same-named files from different
+        folders never collide, and an image already in the manifest (and still
+        on disk) is never re-encoded, whatever its mtime says. Responsive
+        variants hang off the same hash; only the ones missing on disk are
+        encoded, all from one decode of the source, by ``self.encode``.
+        """
+        # Fast path: already handled in this run.
+        with self._images_lock:
+            cached = self._images_done.get(src)
+            if cached is not None:
+                return cached
+
+        digest = self._source_digest(src)
+        ck = _content_key(digest, self._image_fp)
+        known = self.images.get(ck) or {}
+        name = known.get("name") or f"{ck[:8]}-{src.name}"
+        encodable = self.cfg["optimize_images"] and src.suffix.lower() in _ENCODABLE
+
+        width = known.get("w")
+        if encodable and width is None:
+            # Header only: enough to plan variant names before (or without) encoding.
+            size = _image_size(src)
+            width = min(size[0], int(self.cfg["image_max_width"])) if size else None
+        plan = self._plan_variants(src, ck[:8], width) if encodable and width else []
+        have: dict[str, int] = known.get("variants", {})
+        intact = bool(known) and self._on_disk(name, known.get("bytes"))
+        missing = [v for v in plan if not self._on_disk(v[0], have.get(v[0]))]
+
+        if not intact or missing:
+            self.encode(ImageJob(src, ck, digest, name, bool(encodable), not intact,
+                                 tuple(missing), known))
+
+        # Names are known before a single pixel is decoded, so the markdown
+        # can be written while the encode is still queued.
+        pub = self._published(name, width, plan)
+        with self._images_lock:
+            self._images_done[src] = pub
+        return pub
+
+    def _on_disk(self, name: str, size: int | None) -> bool:
+        if size is None:
+            return False
+        try:
+            return (self.image_dest_root / name).stat().st_size == size
+        except OSError:
+            return False
+
+    @functools.cached_property
+    def _formats(self) -> list[str]:
+        """``image_formats`` this Pillow can encode (asked once an image is planned)."""
+        from PIL import features
+
+        formats = []
+        for fmt in self.cfg.get("image_formats") or ():
+            fmt = str(fmt).lower()
+            if fmt not in _VARIANT_FORMATS:
+                log.warning(f"image_formats: unknown format {fmt!r} — ignored")
+            elif not features.check(fmt):
+                log.warning(f"image_formats: this Pillow has no {fmt} encoder — ignored")
+            else:
+                formats.append(fmt)
+        return formats
+
+    def _plan_variants(self, src: Path, h8: str, width: int) -> list[tuple[str, int, str]]:
+        """``(name, width, format)`` for every variant of ``src``; "" = source format.
+
+        Widths at or above the fallback's own width are left to the fallback
+        (no upscaling); extra formats also get a copy at the fallback width.
+        """
+        widths = [w for w in self._widths if w < width]
+        plan = [(f"{h8}-{src.stem}-{w}{src.suffix}", w, "") for w in widths]
+        for fmt in self._formats:
+            plan += [(f"{h8}-{src.stem}-{w}.{fmt}", w, fmt) for w in (*widths, width)]
+        return plan
+
+    @staticmethod
+    def _published(name: str, width: int | None,
+                   variants: list[tuple[str, int, str]]) -> Published:
+        if not variants:
+            return Published(name)
+        sets: dict[str, list[str]] = {}
+        for vname, w, fmt in variants:
+            sets.setdefault(fmt, []).append(f"/images/{vname} {w}w")
+        srcset = ""
+        if "" in sets:
+            srcset = ", ".join([*sets.pop(""), f"/images/{name} {width}w"])
+        return Published(name, srcset, tuple((fmt, ", ".join(v)) for fmt, v in sets.items()))
+
+    def image_name(self, src: Path) -> str | None:
+        """Fallback name ``src`` was last published under with the current settings."""
+        rec = self.sources.get(str(src))
+        known = rec and self.images.get(_content_key(rec["sha1"], self._image_fp))
+        return known["name"] if known else None
+
+    def adopt(self, learned: dict[str, Any]) -> None:
+        """Merge what a worker process's Converter learned (see _convert_chunk)."""
+        with self._images_lock:
+            self.sources.update(learned["sources"])
+            self._images_done.update((Path(k), v) for k, v in learned["published"].items())
+        for job in learned["jobs"]:
+            self.encode(job)
+
+    def encode_now(self, job: ImageJob) -> None:
+        """Run ``job`` on the calling thread (no Build, or a one-off use)."""
+        self.record(job, _encode_traced(self.cfg, self.image_dest_root, job))
+
+    def record(self, job: ImageJob, result: tuple) -> None:
+        """Store a finished encode in the image manifest."""
+        dims, made, main_bytes, _ = result
+        with self._images_lock:
+            entry = dict(job.known)
+            if job.main:
+                entry.update(name=job.name, src=job.digest, bytes=main_bytes)
+                entry["w"], entry["h"] = dims or (None, None)
+            if made or "variants" in entry:
+                entry["variants"] = {**entry.get("variants", {}), **made}
+            self.images[job.ck] = entry
+
+    def forget_image(self, src: Path) -> None:
+        """Drop ``src`` from this run's dedup map so the next use re-hashes it."""
+        with self._images_lock:
+            self._images_done.pop(src, None)
+
+    # ─── Front matter writer (Hugo-friendly inline arrays) ───────────────────
+
+    _PRIMARY = ("title", "date", "draft", "description",
+                "categories", "tags", "difficulties", "platforms", "tools")
+
+    def render_frontmatter(self, fm: dict) -> str:
+        return o2h_frontmatter.dump(fm, self._PRIMARY)
+
+    # ─── Per-file pipeline ───────────────────────────────────────────────────
+
+    def convert_text(self, src: Path, raw: str, note: Note | None = None) -> str:
+        name = note.key if note is not None else src.name
+        with _span("split_frontmatter", name):
+            fm, body = self._split_frontmatter(raw)
+        words = len(body.split())
+        with _span("render_body", name):
+            body, code = self.render_body(body, src.parent, note)
+        with _span("fill_frontmatter", name):
+            fm = self._fill_frontmatter(fm, src, body, note, code)
+        if note is not None and note.key:
+            note.ident = self._identity(note, fm)
+            note.meta = self._meta(fm, words)
+            if self.cfg.get("search_index_dir") and not _flag(fm.get("draft")):
+                with _span("search", name):
+                    note.search = o2h_search.document(fm, body, note.ident["url"])
+        with _span("render_frontmatter", name):
+            head = self.render_frontmatter(fm)
+        return f"---\n{head}\n---\n\n{body.lstrip()}"
+
+    @staticmethod
+    def _identity(note: Note, fm: dict) -> dict[str, Any]:
+        """What other notes' links can match this one by (see LinkIndex)."""
+        aliases = fm.get("aliases") or []
+        if isinstance(aliases, str):
+            aliases = [aliases]
+        heads: list[str] = []
+        seen: dict[str, int] = {}
+        for text in note.heads:
+            a = _anchor(text)
+            n = seen[a] = seen.get(a, -1) + 1
+            # Repeated headings get "-1", "-2", … like Hugo's own ids.
+            heads.append(f"{a}-{n}" if n else a)
+        return {
+            "url": _note_url(note.key, fm),
+            "title": str(fm.get("title") or ""),
+            "aliases": [str(a) for a in aliases if a],
+            "heads": heads,
+            "draft": _flag(fm.get("draft")),
+        }
+
+    @staticmethod
+    def _meta(fm: dict, words: int) -> dict[str, Any]:
+        """Word count and taxonomies of a note, for ``o2h stats``."""
+        meta: dict[str, Any] = {"words": words}
+        for k in STATS_TAXONOMIES:
+            v = fm.get(k)
+            values = [str(x) for x in v if x] if isinstance(v, list) else [str(v)] if v else []
+            if values:
+                meta[k] = values
+        return meta
+
+
+# ─── Driver ───────────────────────────────────────────────────────────────────
+
+def _iter_markdown(root: Path) -> Iterable[tuple[str, os.DirEntry]]:
+    """Yield ``(rel_key, entry)`` for every non-hidden .md below ``root``.
+
+    A plain scandir walk: no Path objects per file, and the DirEntry carries
+    its stat so the planner's fast path costs one syscall per note.
+    """
+    stack = [(str(root), "")]
+    while stack:
+        d, prefix = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError as e:
+            log.warning(f"scan {d}: {e}")
+            continue
+        with it:
+            for e in it:
+                if e.name.startswith("."):
+                    continue
+                if e.is_dir():
+                    stack.append((e.path, f"{prefix}{e.name}/"))
+                elif e.name.endswith(".md"):
+                    yield f"{prefix}{e.name}", e
+
+
+def _output_rel(rel_key: str) -> str:
+    # obsidian-vault/posts/foo.md  →  content/posts/foo.md  (drop the redundant 'posts/').
+    return rel_key[6:] if rel_key.startswith("posts/") else rel_key
+
+
+def _output_path(src: Path, src_root: Path, out_root: Path) -> Path:
+    return out_root / _output_rel(src.relative_to(src_root).as_posix())
+
+
+def _convert_one(c: Converter, rel_key: str, src: Path, dest: Path,
+                 raw: str) -> dict[str, Any]:
+    """Convert + write one note; return the manifest fields it produced.
+
+    Plus ``wrote`` — False when the output already held these bytes — which
+    the Build takes out before the fields reach the manifest.
+    """
+    with _span("convert", rel_key):
+        note = Note(src, rel_key)
+        data = c.convert_text(src, raw, note).encode("utf-8")
+        with _span("write", rel_key):
+            wrote = _write_if_changed(dest, data)
+    keys = sorted(note.cfg_keys)
+    fields = {
+        "wrote": wrote,
+        "keys": keys,
+        "cfg": _fingerprint(c.cfg, keys),
+        "ver": __version__,
+        "out": Cache.make_entry(_sha1(data), dest.stat()),
+    }
+    if note.images:
+        fields["img"] = sorted(note.images)
+    if note.ident is not None:
+        fields["ident"] = note.ident
+    if note.links:
+        fields["links"] = note.links
+    if note.meta is not None:
+        fields["meta"] = note.meta
+    # Like "wrote", taken out by the Build: it goes to the search index.
+    fields["search"] = note.search
+    return fields
+
+
+# ─── Process-pool workers ─────────────────────────────────────────────────────
+#
+# convert_text is regex/string work that holds the GIL, so threads stop
+# scaling after about one core. In process mode each worker builds its own
+# Converter once (initializer) and is fed chunks of notes to amortise IPC.
+
+_CHUNK_NOTES = 16
+_CHUNK_BYTES = 1 << 20
+# Below this many stale notes, pool start-up outweighs the parallelism.
+_AUTO_PROCESS_MIN = 64
+
+_worker: dict[str, Any] = {}
+
+
+def _proc_init(cfg: dict[str, Any], images: dict[str, dict[str, Any]],
+               sources: dict[str, dict[str, Any]], links: LinkIndex,
+               verbose: bool, profile: bool = False) -> None:
+    global _profiler
+    _setup_logging(verbose)
+    if profile:
+        _profiler = Profiler()
+    c = Converter(cfg, dict(images), dict(sources), links)
+    # Image encodes go back to the parent's ImagePool, which dedups them
+    # across workers and owns the image manifest.
+    _worker["jobs"] = []
+    c.encode = _worker["jobs"].append
+    _worker["c"] = c
+    _worker["sent"] = {"sources": dict(sources), "published": {}}
+
+
+def _convert_chunk(chunk: list[tuple[str, str, str, str]]
+                   ) -> tuple[list[tuple[str, dict | None, str | None]], dict[str, dict]]:
+    """Convert a chunk in a worker.
+
+    Returns per-note results and what the worker's Converter learned since the
+    previous chunk — source digests, published images (source → markup) and
+    the image encodes it planned — so the parent ends the run knowing what
+    its threads would have known.
+    """
+    c: Converter = _worker["c"]
+    results = []
+    for rel_key, src, dest, raw in chunk:
+        try:
+            results.append((rel_key, _convert_one(c, rel_key, Path(src), Path(dest), raw), None))
+        except Exception as e:
+            results.append((rel_key, None, str(e)))
+    learned: dict[str, Any] = {"jobs": _worker["jobs"][:]}
+    _worker["jobs"].clear()
+    if _profiler is not None:
+        learned["spans"] = _profiler.spans[:]
+        _profiler.spans.clear()
+    for kind, now in (("sources", c.sources),
+                      ("published", {str(k): v for k, v in c._images_done.items()})):
+        sent = _worker["sent"][kind]
+        learned[kind] = {k: v for k, v in now.items() if sent.get(k) != v}
+        sent.update(learned[kind])
+    return results, learned
+
+
+class Build:
+    """One conversion session: config, manifest and a warm Converter.
+
+    ``run`` is the classic full incremental pass. ``run_paths`` converts just
+    the given files against the same in-memory state, which is what keeps
+    ``o2h watch`` in the tens-of-milliseconds range per save.
+    """
+
+    def __init__(self, source: Path, output: Path, cfg: dict[str, Any]):
+        self.source = source
+        self.output = output
+        self.cfg = cfg
+        self.cache = Cache.load(Path(cfg["cache_dir"]) / "manifest.json")
+        self.links = LinkIndex()
+        self._linked = False   # links filled from the manifest (see _sync_links)
+        self.converter = Converter(cfg, self.cache.images, self.cache.sources, self.links)
+        self._fp_memo: dict[tuple[str, ...], str] = {}
+        self.mode = "thread"   # executor the last _execute used
+        self.written = self.unchanged = 0   # outputs, per run
+        search_dir = cfg.get("search_index_dir")
+        self.search = (o2h_search.ShardedIndex(Path(search_dir), Path(cfg["cache_dir"]),
+                                               _write_if_changed) if search_dir else None)
+        self._search_docs: dict[str, dict[str, Any] | None] = {}   # rel_key → doc, this run
+
+    # ── Plan ──────────────────────────────────────────────────────────────────
+
+    def _entry_current(self, entry: dict[str, Any]) -> bool:
+        """Same converter version and same values for every key it read?"""
+        if entry.get("ver") != __version__:
+            return False
+        keys = tuple(entry.get("keys", ()))
+        fp = self._fp_memo.get(keys)
+        if fp is None:
+            fp = self._fp_memo[keys] = _fingerprint(self.cfg, keys)
+        return entry.get("cfg") == fp
+
+    def _output_intact(self, entry: dict[str, Any], dest: str) -> bool:
+        """Output still holds what we wrote (stat first, digest on mismatch)."""
+        out = entry.get("out")
+        if not out:
+            return False
+        try:
+            st = os.stat(dest)
+        except OSError:
+            return False
+        if out.get("st") == _stat_key(st):
+            return True
+        try:
+            with open(dest, "rb") as f:
+                digest = _sha1(f.read())
+        except OSError:
+            return False
+        if digest != out.get("sha1"):
+            log.info(f"Output changed on disk, regenerating: {dest}")
+            return False
+        entry["out"] = Cache.make_entry(digest, st)
+        self.cache.dirty = True
+        return True
+
+    def _plan_one(self, rel_key: str, force: bool,
+                  new_cache: dict[str, dict[str, Any]],
+                  st: os.stat_result | None = None) -> tuple[str, Path, Path, str] | None:
+        """Stat first; read + hash only when the stat tuple moved.
+
+        Returns a job, or None when the file is up-to-date or unreadable.
+        """
+        src = os.path.join(self.source, rel_key)
+        dest = os.path.join(self.output, _output_rel(rel_key))
+        try:
+            st = st or os.stat(src)
+        except OSError as e:
+            log.error(f"stat {src}: {e}")
+            return None
+
+        old = None if force else self.cache.entries.get(rel_key)
+        # Checked once: on a mismatch it re-hashes the output and logs.
+        intact = old is not None and self._entry_current(old) and self._output_intact(old, dest)
+        if intact and self.cache.stat_matches(rel_key, st):
+            new_cache[rel_key] = old
+            return None
+
+        try:
+            with _span("read", rel_key), open(src, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            log.error(f"read {src}: {e}")
+            return None
+        with _span("hash", rel_key):
+            digest = _sha1(data)
+        entry = Cache.make_entry(digest, st)
+        self.cache.dirty = True
+
+        if intact and old.get("sha1") == digest:
+            # Touched but byte-identical: refresh the stat tuple, skip the work.
+            new_cache[rel_key] = {**old, **entry}
+            return None
+
+        try:
+            text = data.decode("utf-8")
+        except UnicodeDecodeError as e:
+            log.error(f"decode {src}: {e}")
+            return None
+        # Recorded only once the conversion succeeds (see _execute), so a
+        # failed note is retried on the next run instead of looking cached.
+        new_cache[rel_key] = entry
+        return rel_key, Path(src), Path(dest), text
+
+    # ── Execute ───────────────────────────────────────────────────────────────
+
+    def _record(self, new_cache: dict[str, dict[str, Any]], rel_key: str,
+                fields: dict[str, Any]) -> None:
+        """Store a conversion's manifest fields (caller holds the lock)."""
+        if fields.pop("wrote"):
+            self.written += 1
+        else:
+            self.unchanged += 1
+        self._search_docs[rel_key] = fields.pop("search")
+        new_cache[rel_key].update(fields)
+
+    def _writes(self) -> str:
+        return f"{self.written} written, {self.unchanged} unchanged"
+
+    def _workers(self, jobs: int | None = None) -> int:
+        workers_cfg = int(self.cfg.get("max_workers") or 0)
+        workers = workers_cfg if workers_cfg > 0 else (os.cpu_count() or 4)
+        return max(1, min(workers, jobs) if jobs is not None else workers)
+
+    def _image_workers(self) -> int:
+        n = int(self.cfg.get("image_workers") or 0)
+        # Auto: half the cores — encodes run alongside the text workers.
+        return n if n > 0 else max(1, (os.cpu_count() or 2) // 2)
+
+    @contextlib.contextmanager
+    def _encoding(self) -> Iterator[ImagePool]:
+        """Route the Converter's image encodes to an ImagePool for one pass."""
+        mode = str(self.cfg.get("image_executor") or "thread").lower()
+        if mode not in ("thread", "process"):
+            log.warning(f"Unknown image_executor {mode!r} — using thread")
+            mode = "thread"
+        pool = ImagePool(self.cfg, self.converter.record, self._image_workers(),
+                         processes=mode == "process")
+        self.converter.encode = pool.submit
+        try:
+            yield pool
+        finally:
+            pool.close()
+            self.converter.encode = self.converter.encode_now
+
+    def _executor(self, head: list[tuple[str, Path, Path, str]], more: bool,
+                  workers: int) -> str:
+        """Resolve ``executor: auto`` from the first jobs the planner produced."""
+        mode = str(self.cfg.get("executor") or "auto").lower()
+        if mode not in ("thread", "process", "auto"):
+            log.warning(f"Unknown executor {mode!r} — using auto")
+            mode = "auto"
+        if workers == 1:
+            return "thread"
+        if mode != "auto":
+            return mode
+        if not more and len(head) < _AUTO_PROCESS_MIN:
+            return "thread"
+        cpus = (len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity")
+                else os.cpu_count() or 1)
+        # One core: processes only add IPC on top of the same serial work.
+        return "thread" if cpus == 1 else "process"
+
+    def _execute(self, jobs: Iterable[tuple[str, Path, Path, str]], workers: int,
+                 new_cache: dict[str, dict[str, Any]]) -> tuple[int, int]:
+        """Convert ``jobs`` as they arrive; return (submitted, failed).
+
+        ``jobs`` may be a lazy generator (the planner): the pool starts on the
+        first job while the walk is still running, and at most ``queue_depth``
+        decoded notes are alive at once — memory tracks the queue, not the vault.
+        """
+        submitted = errors = 0
+        lock = threading.Lock()
+        self.mode = "thread"
+
+        def done(rel_key: str, src: Path, fields: dict[str, Any] | None,
+                 exc: BaseException | None) -> None:
+            nonlocal errors
+            with lock:
+                if exc is None:
+                    self._record(new_cache, rel_key, fields)
+                else:
+                    log.error(f"{src.name}: {exc}")
+                    new_cache.pop(rel_key, None)
+                    errors += 1
+
+        if workers == 1:
+            for rel_key, src, dest, raw in jobs:
+                submitted += 1
+                try:
+                    done(rel_key, src, _convert_one(self.converter, rel_key, src, dest, raw), None)
+                except Exception as e:
+                    done(rel_key, src, None, e)
+            return submitted, errors
+
+        it = iter(jobs)
+        # Peek far enough ahead for auto to see how much is stale.
+        head = list(itertools.islice(it, _AUTO_PROCESS_MIN))
+        if not head:
+            # Nothing stale: don't even spin up the pool.
+            return 0, 0
+        more = len(head) == _AUTO_PROCESS_MIN
+        self.mode = self._executor(head, more, workers)
+
+        depth = int(self.cfg.get("queue_depth") or 0) or workers * 4
+        if self.mode == "process":
+            return self._execute_processes(itertools.chain(head, it), workers,
+                                           depth, new_cache)
+        slots = threading.BoundedSemaphore(depth)
+
+        def finished(fut: Future, rel_key: str, src: Path) -> None:
+            try:
+                exc = fut.exception()
+                done(rel_key, src, None if exc else fut.result(), exc)
+            finally:
+                slots.release()
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for rel_key, src, dest, raw in itertools.chain(head, it):
+                slots.acquire()   # back-pressure: the planner waits for a free slot
+                submitted += 1
+                fut = pool.submit(_convert_one, self.converter, rel_key, src, dest, raw)
+                fut.add_done_callback(
+                    lambda f, k=rel_key, s=src: finished(f, k, s))
+        return submitted, errors
+
+    def _execute_processes(self, jobs: Iterable[tuple[str, Path, Path, str]],
+                           workers: int, depth: int,
+                           new_cache: dict[str, dict[str, Any]]) -> tuple[int, int]:
+        """Process-pool variant of ``_execute``: chunks in, results + stamps out."""
+        submitted = errors = 0
+        lock = threading.Lock()
+        # Back-pressure in chunks, sized so ~depth notes are in flight.
+        slots = threading.BoundedSemaphore(max(workers, -(-depth // _CHUNK_NOTES)))
+
+        def finished(fut: Future, chunk: list[tuple[str, str, str, str]]) -> None:
+            nonlocal errors
+            try:
+                exc = fut.exception()
+                with lock:
+                    if exc is not None:
+                        # The whole chunk is lost (e.g. a worker died).
+                        for rel_key, src, *_ in chunk:
+                            log.error(f"{Path(src).name}: {exc}")
+                            new_cache.pop(rel_key, None)
+                        errors += len(chunk)
+                        return
+                    results, learned = fut.result()
+                    self.converter.adopt(learned)
+                    if _profiler is not None:
+                        _profiler.spans.extend(learned.get("spans", ()))
+                    for rel_key, fields, err in results:
+                        if err is None:
+                            self._record(new_cache, rel_key, fields)
+                        else:
+                            log.error(f"{rel_key.rsplit('/', 1)[-1]}: {err}")
+                            new_cache.pop(rel_key, None)
+                            errors += 1
+            finally:
+                slots.release()
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_proc_init,
+            initargs=(self.cfg, self.cache.images, self.cache.sources, self.links,
+                      log.isEnabledFor(logging.DEBUG), _profiler is not None),
+        ) as pool:
+
+            def submit(chunk: list[tuple[str, str, str, str]]) -> None:
+                slots.acquire()
+                fut = pool.submit(_convert_chunk, chunk)
+                fut.add_done_callback(lambda f, c=chunk: finished(f, c))
+
+            chunk: list[tuple[str, str, str, str]] = []
+            size = 0
+            for rel_key, src, dest, raw in jobs:
+                submitted += 1
+                chunk.append((rel_key, str(src), str(dest), raw))
+                size += len(raw)
+                if len(chunk) >= _CHUNK_NOTES or size >= _CHUNK_BYTES:
+                    submit(chunk)
+                    chunk, size = [], 0
+            if chunk:
+                submit(chunk)
+        return submitted, errors
+
+    # ── Entry points ──────────────────────────────────────────────────────────
+
+    def run(self, force: bool = False) -> int:
+        t0 = datetime.now()
+        new_cache: dict[str, dict[str, Any]] = {}
+        self.written = self.unchanged = 0
+        self._search_docs = {}
+        # The walk is listed first so every file name can be in the link
+        # index before the first note resolves its wikilinks.
+        walk = list(_iter_markdown(self.source))
+        present = {rel_key for rel_key, _ in walk}
+        if not present:
+            # Never prune from an empty walk: a wrong --source must not wipe the site.
+            log.warning(f"No .md found in {self.source}")
+            return 0
+        old = self.cache.entries
+        if self.search is not None and not self.search.intact() and not force:
+            # Rebuilding the index needs every note's terms, i.e. a conversion.
+            log.info("Search index missing — converting every note to rebuild it")
+            force = True
+        if force and self.search is not None:
+            self.search.reset()
+        gone = {k: e for k, e in old.items() if k not in present}
+        vanished: dict[str, dict[str, Any] | None] = {}
+        planned: list[str] = []
+        synced = False
+
+        # Only a run with work resolves wikilinks: the index is synced at the
+        # first stale note (or a removed one), never on an up-to-date run.
+        def link() -> None:
+            nonlocal synced
+            if not synced:
+                synced = True
+                vanished.update(self._sync_links(present))
+                vanished.update((k, e.get("ident")) for k, e in gone.items())
+
+        if gone:
+            link()
+
+        # ── Plan → convert as one stream: stat, read + hash only if stale. ────
+        def jobs() -> Iterable[tuple[str, Path, Path, str]]:
+            for rel_key, entry in walk:
+                job = self._plan_one(rel_key, force, new_cache, entry.stat())
+                if job is not None:
+                    link()
+                    planned.append(rel_key)
+                    yield job
+
+        workers = self._workers()
+        with self._encoding() as images:
+            converted, errors = self._execute(jobs(), workers, new_cache)
+            late = self._relink(planned, new_cache, vanished, quiet=force or not old)
+            if late:
+                errors += self._execute(late, self._workers(len(late)), new_cache)[1]
+            text_ms = int((datetime.now() - t0).total_seconds() * 1000)
+        # Leaving the block waited for the encodes the notes queued.
+        relinked = len({job[0] for job in late} - set(planned))
+        skipped = len(present) - converted - relinked
+
+        # Notes that failed this run keep their previous output and images alive.
+        failed = [old[k] for k in present - new_cache.keys() if k in old]
+        self.cache.entries = new_cache
+        pruned = self._prune(gone, failed)
+        if converted or relinked or gone:
+            self._write_backlinks()
+            self._write_search(gone)
+
+        if not converted and not relinked:
+            _ok(f"Up-to-date ({skipped} files cached)")
+            if self.cache.dirty or pruned or new_cache.keys() != old.keys():
+                self.cache.save()
+            return 0
+
+        self.cache.save()
+
+        if errors:
+            log.error(f"{errors} file(s) failed")
+        unresolved = sum(href is None for k in planned
+                         for href in new_cache.get(k, {}).get("links", {}).values())
+        if unresolved:
+            log.warning(f"{unresolved} wikilink(s) match no note — kept as /posts/<slug>/ "
+                        f"(-v lists them)")
+        extra = f", {relinked} re-linked" if relinked else ""
+        _ok(f"Converted {converted - errors}/{converted} in {text_ms}ms "
+            f"({skipped} cached{extra}; {self._writes()}) — "
+            f"{max(1, min(workers, converted))} {self.mode} worker(s)")
+        self._report_images(images, t0)
+        return 1 if errors or images.failed else 0
+
+    def check(self) -> int:
+        """``--check``: 0 when ``run`` would have nothing to do, 1 otherwise.
+
+        Read-only — the same stat-then-hash planning as ``run``, but nothing
+        is converted, written or saved.
+        """
+        walk = list(_iter_markdown(self.source))
+        present = {rel_key for rel_key, _ in walk}
+        scratch: dict[str, dict[str, Any]] = {}
+        stale = [rel_key for rel_key, entry in walk
+                 if self._plan_one(rel_key, False, scratch, entry.stat()) is not None]
+        gone = sorted(self.cache.entries.keys() - present) if present else []
+        for rel_key in stale:
+            log.info(f"stale: {rel_key}")
+        for rel_key in gone:
+            log.info(f"removed: {rel_key}")
+        if present and self.search is not None and not self.search.intact():
+            log.warning(f"Out of date: search index missing in {self.search.root}")
+            return 1
+        if stale or gone:
+            log.warning(f"Out of date: {len(stale)} note(s) to convert, "
+                        f"{len(gone)} removed (-v lists them)")
+            return 1
+        _ok(f"Up-to-date ({len(present)} files)")
+        return 0
+
+    # ── Links ─────────────────────────────────────────────────────────────────
+
+    def _sync_links(self, present: set[str]) -> dict[str, dict[str, Any]]:
+        """Index every walked note under its recorded identity and links.
+
+        Returns the identities of the notes that left the index: whatever
+        linked to them has to be looked at again.
+        """
+        removed = {}
+        for rel_key in [k for k in self.links.notes if k not in present]:
+            removed[rel_key] = self.links.notes[rel_key]
+            self.links.remove(rel_key)
+            self.links.set_links(rel_key, None)
+        entries = self.cache.entries
+        for rel_key in present:
+            entry = entries.get(rel_key, {})
+            ident = entry.get("ident")
+            known = self.links.notes.get(rel_key)
+            if known is None or (ident is not None and ident is not known):
+                self.links.add(rel_key, ident)
+            self.links.set_links(rel_key, entry.get("links"))
+        self._linked = True
+        return removed
+
+    def _relink(self, keys: Iterable[str], new_cache: dict[str, dict[str, Any]],
+                changed: dict[str, dict[str, Any] | None] | None = None,
+                quiet: bool = False) -> list[tuple[str, Path, Path, str]]:
+        """Index what ``keys`` were just converted with; plan the notes whose
+        wikilinks now resolve differently.
+
+        A note whose identity (file name, title, aliases, headings) changed —
+        or that appeared or vanished (``changed``: key → old identity) —
+        cascades to the notes linking to it by any old or new name. Only those
+        are re-checked, and only those whose links really resolve differently
+        are re-rendered. Identities never depend on links, so one cascade
+        settles everything. Each cascade is logged, at debug level when
+        ``quiet`` (a cold or forced build, where every note is new).
+        """
+        changed = dict(changed or {})
+        for rel_key in keys:
+            entry = new_cache.get(rel_key)
+            if entry is None:
+                continue
+            ident = entry.get("ident")
+            old = self.links.notes.get(rel_key)
+            if ident is not None and ident != old:
+                self.links.add(rel_key, ident)
+                changed[rel_key] = old
+            self.links.set_links(rel_key, entry.get("links"))
+
+        late: list[tuple[str, Path, Path, str]] = []
+        queued: set[str] = set()
+        for rel_key, old in changed.items():
+            stale = []
+            for dep in sorted(self.links.dependents(rel_key, old) - queued):
+                entry = new_cache.get(dep) or self.cache.entries.get(dep)
+                links = entry.get("links", {}) if entry else {}
+                if any(self.links.resolve(t) != href for t, href in links.items()):
+                    stale.append(dep)
+            if not stale:
+                continue
+            more = f" (+{len(stale) - 5} more)" if len(stale) > 5 else ""
+            (log.debug if quiet else log.info)(f"Link cascade: {rel_key} → {', '.join(stale[:5])}{more}")
+            queued.update(stale)
+            for dep in stale:
+                job = self._plan_one(dep, True, new_cache)
+                if job is not None:
+                    late.append(job)
+        return late
+
+    def _write_backlinks(self) -> None:
+        """``backlinks_file``: page URL → the published pages linking to it.
+
+        Hugo reads it as ``site.Data.backlinks`` — one map lookup per page,
+        where collecting backlinks in a template scans every page per page.
+        """
+        target = self.cfg.get("backlinks_file")
+        if not target:
+            return
+        back: dict[str, dict[str, str]] = {}
+        for rel_key, entry in self.cache.entries.items():
+            ident = entry.get("ident")
+            if not ident or ident.get("draft") or rel_key not in self.links.notes:
+                continue
+            for href in entry.get("links", {}).values():
+                dest = self.links.key_for(href.partition("#")[0]) if href else None
+                if dest is not None and dest != rel_key:
+                    back.setdefault(self.links.notes[dest]["url"], {})[ident["url"]] = ident["title"]
+        data = {
+            url: [{"url": u, "title": t}
+                  for u, t in sorted(refs.items(), key=lambda r: (r[1].lower(), r[0]))]
+            for url, refs in sorted(back.items())
+        }
+        blob = json.dumps(data, ensure_ascii=False, indent=2) + "\n"
+        path = Path(target)
+        try:
+            if path.read_text(encoding="utf-8") == blob:
+                return
+        except OSError:
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(path, lambda tmp: tmp.write_text(blob, encoding="utf-8"))
+        log.debug(f"Backlinks: {len(data)} page(s) → {path}")
+
+    def _write_search(self, gone: dict[str, dict[str, Any]], partial: bool = False) -> None:
+        """Fold this run's documents (and removed notes) into the search index.
+
+        ``partial``: only some notes were looked at, so a missing index can't
+        be rebuilt from them — leave it to the next full run.
+        """
+        if self.search is None:
+            return
+        if partial and not self.search.intact():
+            log.debug("Search index missing — rebuilt by the next full run")
+            return
+        changes = dict(self._search_docs)
+        changes.update((k, None) for k in gone)
+        if not changes:
+            return
+        with _span("search_index"):
+            shards = self.search.update(changes)
+        log.debug(f"Search index: {len(changes)} note(s), {shards} shard(s) written "
+                  f"→ {self.search.root}")
+
+    # ── Prune ─────────────────────────────────────────────────────────────────
+
+    def _prune_mode(self) -> str:
+        mode = self.cfg.get("prune", "on")
+        if isinstance(mode, bool):
+            return "on" if mode else "off"
+        mode = str(mode).lower()
+        if mode not in ("on", "off", "dry-run"):
+            log.warning(f"Unknown prune mode {mode!r} — using dry-run")
+            return "dry-run"
+        return mode
+
+    def _prune(self, gone: dict[str, dict[str, Any]],
+               keep: Iterable[dict[str, Any]] = ()) -> int:
+        """Delete what vanished sources produced; return files removed.
+
+        ``gone`` are manifest entries whose source no longer exists: their
+        output goes. Images are reference-counted through each entry's "img"
+        list — a file in static/ goes only when no remaining entry (nor any in
+        ``keep``) embeds it. Only files the manifest records are ever touched:
+        hand-placed posts and images are invisible here.
+        """
+        mode = self._prune_mode()
+        if mode == "off":
+            return 0
+        dry = mode == "dry-run"
+        refs = {n for e in itertools.chain(self.cache.entries.values(), keep)
+                for n in e.get("img", ())}
+        if dry:
+            # Keep the orphans on record so a later real prune still finds them.
+            self.cache.entries.update(gone)
+
+        victims: list[Path] = [self.output / _output_rel(k) for k in gone]
+        images = self.converter.images
+        dead = [ck for ck, e in images.items() if e.get("name") not in refs]
+        root = self.converter.image_dest_root
+        for ck in dead:
+            victims.append(root / images[ck]["name"])
+            victims.extend(root / v for v in images[ck].get("variants", ()))
+
+        removed = 0
+        for path in victims:
+            if not path.exists():
+                continue
+            if dry:
+                log.info(f"prune (dry-run): would remove {path}")
+                removed += 1
+                continue
+            try:
+                path.unlink()
+            except OSError as e:
+                log.warning(f"prune {path}: {e}")
+                continue
+            removed += 1
+            log.debug(f"pruned {path}")
+            # Drop directories the deletion emptied, up to the output root.
+            parent = path.parent
+            while parent != self.output and parent.is_relative_to(self.output):
+                try:
+                    parent.rmdir()
+                except OSError:
+                    break
+                parent = parent.parent
+
+        if not dry:
+            for ck in dead:
+                del images[ck]
+            live = {e.get("src") for e in images.values()}
+            for key in [k for k, r in self.converter.sources.items() if r.get("sha1") not in live]:
+                del self.converter.sources[key]
+            self.cache.dirty = self.cache.dirty or bool(gone or dead)
+        if removed:
+            verb = "Would prune" if dry else "Pruned"
+            _ok(f"{verb} {removed} file(s): {len(gone)} orphaned post(s), "
+                f"{len(dead)} unreferenced image(s)")
+        return removed
+
+    def _report_images(self, images: ImagePool, t0: datetime) -> None:
+        rss = _peak_rss_mib()
+        tail = f" — peak RSS {rss:.0f} MiB" if rss is not None else ""
+        if images.encoded or images.variants:
+            ms = int((datetime.now() - t0).total_seconds() * 1000)
+            _ok(f"Images: {images.encoded} encoded + {images.variants} variant(s), "
+                f"{_human(images.saved)} saved, done at {ms}ms{tail}")
+        elif tail:
+            log.debug(f"Peak RSS {rss:.0f} MiB")
+
+    def _note_key(self, p: Path) -> str | None:
+        """Manifest key for a vault note, or None for anything else."""
+        if p.suffix != ".md":
+            return None
+        try:
+            rel = p.relative_to(self.source)
+        except ValueError:
+            return None
+        if any(part.startswith(".") for part in rel.parts):
+            return None
+        return rel.as_posix()
+
+    def run_paths(self, paths: Iterable[Path]) -> int:
+        """Convert only ``paths`` (notes or images) against the warm state."""
+        t0 = datetime.now()
+        pending: list[tuple[str, Path, Path, str]] = []
+        new_cache: dict[str, dict[str, Any]] = {}
+        self.written = self.unchanged = 0
+        self._search_docs = {}
+        gone: dict[str, dict[str, Any]] = {}
+        images = 0
+        notes: dict[str, bool] = {}   # rel_key → force
+        vanished: dict[str, dict[str, Any]] = {}
+        if not self._linked:
+            # After an up-to-date run (or none): every identity, from the manifest.
+            self._sync_links(set(self.cache.entries))
+
+        for p in sorted(paths):
+            rel_key = self._note_key(p)
+            if rel_key is not None:
+                if p.is_file():
+                    notes.setdefault(rel_key, False)
+                    if rel_key not in self.links.notes:
+                        self.links.add(rel_key)
+                else:
+                    if rel_key in self.links.notes:
+                        vanished[rel_key] = self.links.notes[rel_key]
+                        self.links.remove(rel_key)
+                        self.links.set_links(rel_key, None)
+                    if rel_key in self.cache.entries:
+                        gone[rel_key] = self.cache.entries.pop(rel_key)
+                continue
+            src = p.resolve()
+            name = self.converter.image_name(src)
+            self.converter.forget_image(src)
+            if name is None:
+                continue
+            # New bytes mean a new content address: every note embedding the
+            # old name must be re-rendered to point at the new one.
+            images += 1
+            for key, entry in self.cache.entries.items():
+                if name in entry.get("img", ()):
+                    notes[key] = True
+
+        for rel_key, force in notes.items():
+            job = self._plan_one(rel_key, force, new_cache)
+            if job is not None:
+                pending.append(job)
+
+        with self._encoding() as encodes:
+            _, errors = self._execute(pending, self._workers(len(pending)), new_cache)
+            late = self._relink([job[0] for job in pending], new_cache, vanished)
+            pending += late
+            if late:
+                errors += self._execute(late, self._workers(len(late)), new_cache)[1]
+        self.cache.entries.update(new_cache)
+        removed = len(gone)
+        if pending or gone:
+            self._prune(gone)
+            self._write_backlinks()
+            self._write_search(gone, partial=True)
+        if self.cache.dirty or removed:
+            self.cache.save()
+
+        if pending or removed or images:
+            ms = int((datetime.now() - t0).total_seconds() * 1000)
+            parts = [f"{len({job[0] for job in pending}) - errors} note(s) ({self._writes()})"]
+            if images:
+                parts.append(f"{images} image(s)")
+            if encodes.encoded or encodes.variants:
+                parts.append(f"{encodes.encoded + encodes.variants} file(s) encoded")
+            if removed:
+                parts.append(f"{removed} removed")
+            _ok(f"{', '.join(parts)} in {ms}ms")
+        return 1 if errors or encodes.failed else 0
+
+
+def _load(config_path: Path, **overrides: Any) -> dict[str, Any]:
+    """Config file + the CLI flags that were actually given."""
+    cfg = load_config(config_path)
+    cfg.update((k, v) for k, v in overrides.items() if v is not None)
+    return cfg
+
+
+@contextlib.contextmanager
+def _profiling(trace: str | None, top: int = 10) -> Iterator[None]:
+    """Record spans while the block runs; write the trace + top-N after."""
+    global _profiler
+    if not trace:
+        yield
+        return
+    _profiler = Profiler()
+    try:
+        yield
+    finally:
+        prof, _profiler = _profiler, None
+        prof.write_trace(Path(trace))
+        prof.report(top)
+        _ok(f"Trace: {trace} ({len(prof.spans)} spans) — open in ui.perfetto.dev")
+
+
+def run(source: Path, output: Path, config_path: Path,
+        force: bool = False, verbose: bool = False, executor: str | None = None,
+        prune: str | None = None, profile: str | None = None,
+        profile_top: int = 10, check: bool = False) -> int:
+    _setup_logging(verbose)
+
+    if not source.is_dir():
+        log.error(f"Source not found: {source}")
+        return 2
+
+    cfg = _load(config_path, executor=executor, prune=prune)
+    if check:
+        return Build(source, output, cfg).check()
+    with _profiling(profile, profile_top):
+        return Build(source, output, cfg).run(force=force)
+
+
+def watch(source: Path, output: Path, config_path: Path, *,
+          debounce_ms: int = 50, poll: bool = False, poll_interval: float = 0.5,
+          force: bool = False, verbose: bool = False, executor: str | None = None,
+          prune: str | None = None, profile: str | None = None,
+          profile_top: int = 10) -> int:
+    """Resident converter: one warm Build, fed by inotify (or polling).
+
+    With ``profile`` the whole session is traced; the file is written on exit.
+    """
+    import o2h_watch
+
+    _setup_logging(verbose)
+
+    if not source.is_dir():
+        log.error(f"Source not found: {source}")
+        return 2
+
+    build = Build(source.resolve(), output, _load(config_path, executor=executor, prune=prune))
+    with _profiling(profile, profile_top):
+        build.run(force=force)
+
+        events = o2h_watch.open_source([build.source], poll=poll, interval=poll_interval)
+        kind = type(events).__name__.lower()
+        _ok(f"Watching {source} ({kind}, {debounce_ms}ms debounce) — Ctrl+C to stop")
+        try:
+            while True:
+                changed = events.wait(debounce_ms / 1000)
+                if changed is None:
+                    log.warning("Event queue overflowed — rescanning vault")
+                    build.run()
+                elif changed:
+                    build.run_paths(changed)
+        except KeyboardInterrupt:
+            return 0
+        finally:
+            events.close()
+
+
+def search(source: Path, output: Path, config_path: Path, terms: list[str], *,
+           code: bool = False, limit: int = 10, paths: Iterable[str] = (),
+           force: bool = False, verbose: bool = False) -> int:
+    """Query the vault's full-text index (o2h_fts), refreshing it first.
+
+    ``paths`` are extra notes / directories (e.g. mimo_methodology.md) indexed
+    alongside the vault. Exit 0 with hits, 1 without, 2 on a bad query.
+    """
+    import o2h_fts
+
+    _setup_logging(verbose)
+
+    if not source.is_dir():
+        log.error(f"Source not found: {source}")
+        return 2
+
+    t0 = time.perf_counter()
+    cfg = load_config(config_path)
+    db_path = Path(cfg["cache_dir"]) / "vault.db"
+    if force:
+        for p in (db_path, db_path.with_name(db_path.name + "-wal"),
+                  db_path.with_name(db_path.name + "-shm")):
+            p.unlink(missing_ok=True)
+
+    src_root = source.resolve()
+    roots = [str(src_root)]
+
+    def files() -> Iterator[tuple[str, str, str | None]]:
+        for rel_key, e in _iter_markdown(src_root):
+            yield e.path, roots[0], str(output / _output_rel(rel_key))
+        for extra in paths:
+            p = Path(extra).resolve()
+            if p.is_dir():
+                roots.append(str(p))
+                for _, e in _iter_markdown(p):
+                    yield e.path, str(p), None
+            elif p.is_file():
+                roots.append(str(p))
+                yield str(p), str(p), None
+            else:
+                log.warning(f"--path not found: {extra}")
+
+    try:
+        index = o2h_fts.VaultIndex(db_path)
+    except RuntimeError as e:
+        log.error(str(e))
+        return 2
+    try:
+        updated, removed = index.refresh(
+            files(), lambda p: Converter._title_from_filename(Path(p).stem))
+        t1 = time.perf_counter()
+        tty = sys.stdout.isatty()
+        mark = (_Color.Y, _Color.X) if tty else ("[", "]")
+        try:
+            hits = index.search(terms, roots, code_only=code, limit=limit, mark=mark)
+        except o2h_fts.QueryError as e:
+            log.error(f"Bad query: {e}")
+            return 2
+    finally:
+        index.close()
+    t2 = time.perf_counter()
+
+    cwd = Path.cwd()
+    for hit in hits:
+        p = Path(hit.path)
+        shown = p.relative_to(cwd) if p.is_relative_to(cwd) else p
+        title = f"{_Color.C}{hit.title}{_Color.X}" if tty else hit.title
+        path = f"{_Color.D}{shown}{_Color.X}" if tty else str(shown)
+        print(f"{title}  {path}")
+        if hit.snippet:
+            print(f"    {hit.snippet}")
+    log.debug(f"index: {updated} re-indexed, {removed} removed in "
+              f"{(t1 - t0) * 1000:.1f}ms; query {(t2 - t1) * 1000:.1f}ms")
+    if not hits:
+        log.info("No matches.")
+    return 0 if hits else 1
+
+
+def stats(config_path: Path, *, top: int = 10, as_json: bool = False,
+          verbose: bool = False) -> int:
+    """Vault statistics straight from the manifest: no note or image is read.
+
+    Totals, per-taxonomy counts and the ``top`` largest notes (by words) and
+    images (by bytes, variants included). Notes last converted before
+    metadata was recorded are counted but not measured until reconverted.
+    """
+    _setup_logging(verbose)
+    cfg = load_config(config_path)
+    path = Path(cfg["cache_dir"]) / "manifest.json"
+    cache = Cache.load(path)
+    if not cache.entries:
+        log.error(f"No manifest at {path} — run a conversion first")
+        return 1
+
+    sizes: dict[str, int] = {}   # static/images name → bytes, variants included
+    for rec in cache.images.values():
+        if rec.get("name"):
+            sizes[rec["name"]] = (rec.get("bytes") or 0) + sum((rec.get("variants") or {}).values())
+    used: dict[str, int] = {}    # image name → notes embedding it
+    by: dict[str, dict[str, int]] = {k: {} for k in STATS_TAXONOMIES}
+    notes = []
+    drafts = unmeasured = 0
+    for rel_key, e in cache.entries.items():
+        ident, meta, imgs = e.get("ident") or {}, e.get("meta"), e.get("img") or []
+        drafts += bool(ident.get("draft"))
+        for name in imgs:
+            used[name] = used.get(name, 0) + 1
+        if meta is None:
+            unmeasured += 1
+            continue
+        for k, counts in by.items():
+            for v in meta.get(k, ()):
+                counts[v] = counts.get(v, 0) + 1
+        notes.append({"path": rel_key, "title": ident.get("title", ""),
+                      "words": meta["words"], "draft": bool(ident.get("draft")),
+                      "images": len(imgs), "image_bytes": sum(sizes.get(n, 0) for n in imgs)})
+
+    def ranked(counts: dict[str, int]) -> list[tuple[str, int]]:
+        return sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+
+    total = len(cache.entries)
+    report = {
+        "notes": total, "published": total - drafts, "drafts": drafts,
+        "unmeasured": unmeasured,
+        "words": sum(n["words"] for n in notes),
+        "images": len(used), "image_bytes": sum(sizes.get(n, 0) for n in used),
+        "by": {k: dict(ranked(v)) for k, v in by.items()},
+        "largest_notes": sorted(notes, key=lambda n: (-n["words"], n["path"]))[:top],
+        "largest_images": [{"name": n, "bytes": sizes.get(n, 0), "notes": used[n]}
+                           for n in sorted(used, key=lambda n: (-sizes.get(n, 0), n))[:top]],
+    }
+    if as_json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return 0
+
+    measured = len(notes) or 1
+    print(f"  {'Notes:':<12} {total} ({total - drafts} published, {drafts} drafts)")
+    print(f"  {'Words:':<12} {report['words']} ({report['words'] // measured} per note)")
+    print(f"  {'Images:':<12} {len(used)} ({_human(report['image_bytes'])})")
+    for k, counts in report["by"].items():
+        if counts:
+            shown = ", ".join(f"{v} ({n})" for v, n in list(counts.items())[:top])
+            more = f", … +{len(counts) - top}" if len(counts) > top else ""
+            print(f"  {k.capitalize() + ':':<12} {shown}{more}")
+    if notes:
+        print("\n  Largest notes:")
+        for n in report["largest_notes"]:
+            print(f"    {n['words']:>7} words  {n['path']}"
+                  + (f"  ({n['images']} image(s), {_human(n['image_bytes'])})" if n["images"] else ""))
+    if used:
+        print("\n  Largest images:")
+        for i in report["largest_images"]:
+            print(f"    {_human(i['bytes']):>10}  {i['name']}  ({i['notes']} note(s))")
+    if unmeasured:
+        log.warning(f"{unmeasured} note(s) predate stats metadata — run a conversion to measure them")
+    return 0
+
+
+def _find_note(build: Build, ref: str) -> str | None:
+    """Manifest key for a note given as a file, a vault path or a bare name."""
+    p = Path(ref)
+    if p.suffix == ".md" and p.is_file():
+        key = build._note_key(p.resolve())
+        if key is None:
+            log.error(f"Not a note in {build.source}: {ref}")
+        return key
+    name = ref[:-3] if ref.endswith(".md") else ref
+    if (build.source / f"{name}.md").is_file():
+        return f"{name}.md"
+    found = sorted(k for k in build.cache.entries if f"/{k[:-3]}".endswith(f"/{name}"))
+    if len(found) == 1:
+        return found[0]
+    if found:
+        log.error(f"{ref} is ambiguous: {', '.join(k[:-3] for k in found)}")
+    else:
+        log.error(f"No such note: {ref}")
+    return None
+
+
+def publish(source: Path, output: Path, config_path: Path, notes: list[str], *,
+            draft: bool = False, verbose: bool = False, executor: str | None = None,
+            prune: str | None = None) -> int:
+    """Set ``draft`` in the front matter of ``notes`` and convert only them
+    (plus notes whose links to them now resolve differently).
+
+    Only the ``draft:`` line is rewritten (``o2h_frontmatter.set_key``). With
+    no ``notes``, print those it could apply to — drafts, or for
+    ``draft=True`` published notes — from the manifest, one per line.
+    """
+    _setup_logging(verbose)
+
+    if not source.is_dir():
+        log.error(f"Source not found: {source}")
+        return 2
+
+    build = Build(source.resolve(), output, _load(config_path, executor=executor, prune=prune))
+    entries = build.cache.entries
+    if not notes:
+        for rel_key, e in sorted(entries.items()):
+            ident = e.get("ident")
+            if ident is not None and bool(ident.get("draft")) != draft:
+                print(rel_key[:-3])
+        return 0
+
+    default = bool(build.cfg.get("default_draft"))
+    changed: list[str] = []
+    errors = 0
+    for ref in notes:
+        rel_key = _find_note(build, ref)
+        if rel_key is None:
+            errors += 1
+            continue
+        src = build.source / rel_key
+        try:
+            with open(src, encoding="utf-8", newline="") as f:
+                text = f.read()
+            m = _RE_FRONTMATTER.match(text)
+            if m is None:
+                current = default
+                new = f"---\ndraft: {o2h_frontmatter.scalar(draft)}\n---\n{text}"
+            else:
+                fm = o2h_frontmatter.load(m.group(1))
+                fm = fm if isinstance(fm, dict) else {}
+                current = _flag(fm["draft"]) if "draft" in fm else default
+                block = o2h_frontmatter.set_key(m.group(1), "draft", draft)
+                new = text[:m.start(1)] + block + text[m.end(1):]
+        except (OSError, UnicodeDecodeError, o2h_frontmatter.Error) as e:
+            log.error(f"{rel_key}: {e}")
+            errors += 1
+            continue
+        if current == draft:
+            log.info(f"Already {'a draft' if draft else 'published'}: {rel_key}")
+            continue
+
+        def write(tmp: Path) -> None:
+            tmp.write_bytes(new.encode("utf-8"))
+            shutil.copymode(src, tmp)   # the note keeps its permissions
+
+        _write_atomic(src, write)
+        _ok(f"{'Unpublished' if draft else 'Published'}: {rel_key}")
+        changed.append(rel_key)
+
+    if changed:
+        # run_paths takes every note's identity from the manifest rather
+        # than walking the vault.
+        errors += build.run_paths([build.source / k for k in changed])
+    return 1 if errors else 0
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+def _add_common(p: argparse.ArgumentParser, sub: bool = False) -> None:
+    # Sub-commands re-declare the shared flags so they work on either side of
+    # the command name; SUPPRESS keeps them from clobbering the parent's value.
+    d = (lambda v: argparse.SUPPRESS) if sub else (lambda v: v)
+    p.add_argument("--source", default=d("./obsidian-vault"),
+                   help="Source vault root (default: ./obsidian-vault)")
+    p.add_argument("--output", default=d("./content/posts"),
+                   help="Hugo content/posts dir (default: ./content/posts)")
+    p.add_argument("--config", default=d("scripts/config.yaml"),
+                   help="Path to config.yaml")
+    p.add_argument("--force", action="store_true", default=d(False),
+                   help="Bypass cache; reconvert every file")
+    p.add_argument("-v", "--verbose", action="store_true", default=d(False),
+                   help="Debug logging")
+    p.add_argument("--executor", choices=("thread", "process", "auto"), default=d(None),
+                   help="Worker pool for conversions (default: config 'executor', auto)")
+    p.add_argument("--prune", choices=("on", "off", "dry-run"), default=d(None),
+                   help="Delete outputs/images of removed notes, or just list them "
+                        "(default: config 'prune', on)")
+    p.add_argument("--profile", nargs="?", const="o2h-trace.json", default=d(None),
+                   metavar="TRACE",
+                   help="Time every file and stage; write a Chrome trace "
+                        "(default: o2h-trace.json) and print the slowest")
+    p.add_argument("--profile-top", type=int, default=d(10), metavar="N",
+                   help="How many files/stages --profile prints (default: 10)")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        prog="o2h",
+        description="Obsidian → Hugo converter (fast, incremental, parallel)",
+    )
+    _add_common(ap)
+    ap.add_argument("--clean-cache", action="store_true",
+                    help="Delete the conversion cache, then exit")
+    check_help = "Convert nothing; exit 1 if any note is stale, 0 if up-to-date"
+    ap.add_argument("--check", action="store_true", help=check_help)
+
+    sub = ap.add_subparsers(dest="command", metavar="command")
+    p = sub.add_parser("convert", help="One-shot incremental conversion (default)")
+    _add_common(p, sub=True)
+    p.add_argument("--check", action="store_true", default=argparse.SUPPRESS, help=check_help)
+    p = sub.add_parser("watch", help="Stay resident; reconvert notes as they change")
+    _add_common(p, sub=True)
+    p.add_argument("--debounce-ms", type=int, default=50,
+                   help="Quiet period that closes an event burst (default: 50)")
+    p.add_argument("--poll", action="store_true",
+                   help="Poll the vault instead of using inotify")
+    p.add_argument("--poll-interval", type=float, default=0.5,
+                   help="Seconds between polls in --poll mode (default: 0.5)")
+    p = sub.add_parser("search", help="Full-text search of the vault (local index)",
+                       description="Terms are ANDed. \"a phrase\", prefix*, NOT term, "
+                                   "field:value front-matter filters (field:prefix*).")
+    _add_common(p, sub=True)
+    p.add_argument("terms", nargs="+", metavar="TERM",
+                   help="Query terms (quote multi-word phrases)")
+    p.add_argument("--code", action="store_true",
+                   help="Match inside fenced code blocks only")
+    p.add_argument("-n", "--limit", type=int, default=10,
+                   help="Maximum results (default: 10)")
+    p.add_argument("--path", action="append", default=[], dest="paths", metavar="PATH",
+                   help="Also index this file or directory (repeatable)")
+    for name, what in (("publish", "draft: false"), ("unpublish", "draft: true")):
+        p = sub.add_parser(name, help=f"Set {what} in notes' front matter and convert just those")
+        _add_common(p, sub=True)
+        p.add_argument("notes", nargs="*", metavar="NOTE",
+                       help="File, vault path or name (posts/foo, foo); none lists candidates")
+    p = sub.add_parser("stats", help="Note / word / taxonomy / image counts from the manifest")
+    _add_common(p, sub=True)
+    p.add_argument("--json", action="store_true", help="Machine-readable output")
+    p.add_argument("-n", "--top", type=int, default=10,
+                   help="Largest notes / images and taxonomy values shown (default: 10)")
+    args = ap.parse_args()
+
+    _setup_logging(args.verbose)
+
+    if args.clean_cache:
+        cfg = load_config(Path(args.config))
+        p = Path(cfg["cache_dir"]) / "manifest.json"
+        if p.exists():
+            p.unlink()
+            _ok(f"Cache cleared: {p}")
+        else:
+            log.info("No cache to clear.")
+        return 0
+
+    if args.command == "watch":
+        return watch(
+            Path(args.source),
+            Path(args.output),
+            Path(args.config),
+            debounce_ms=args.debounce_ms,
+            poll=args.poll,
+            poll_interval=args.poll_interval,
+            force=args.force,
+            verbose=args.verbose,
+            executor=args.executor,
+            prune=args.prune,
+            profile=args.profile,
+            profile_top=args.profile_top,
+        )
+
+    if args.command in ("publish", "unpublish"):
+        return publish(
+            Path(args.source),
+            Path(args.output),
+            Path(args.config),
+            args.notes,
+            draft=args.command == "unpublish",
+            verbose=args.verbose,
+            executor=args.executor,
+            prune=args.prune,
+        )
+
+    if args.command == "stats":
+        return stats(Path(args.config), top=args.top, as_json=args.json, verbose=args.verbose)
+
+    if args.command == "search":
+        return search(
+            Path(args.source),
+            Path(args.output),
+            Path(args.config),
+            args.terms,
+            code=args.code,
+            limit=args.limit,
+            paths=args.paths,
+            force=args.force,
+            verbose=args.verbose,
+        )
+
+    return run(
+        Path(args.source),
+        Path(args.output),
+        Path(args.config),
+        force=args.force,
+        verbose=args.verbose,
+        executor=args.executor,
+        prune=args.prune,
+        profile=args.profile,
+        profile_top=args.profile_top,
+        check=args.check,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+o2h_frontmatter.py
+==================
+Front matter for the converter: parse fast, emit faithfully.
+
+- ``load``: most notes open with a flat header — ``key: scalar`` and
+  ``key: [a, b]`` lines, at most one level of ``key:`` maps under them (a
+  cover, config.yaml's taxonomies). Those are parsed by hand (``parse_flat``), with
+  YAML 1.1 scalar rules, into exactly what ``yaml.safe_load`` would return.
+  Anything else (nesting, block lists, anchors, unquoted timestamps, …) goes
+  to libyaml's ``CSafeLoader``, or to the pure-Python ``SafeLoader`` when
+  PyYAML was built without libyaml. PyYAML is only imported then.
+- ``dump``: YAML that loads back to the same values — nested maps, lists of
+  maps, dates and datetimes, multi-line strings as literal blocks — instead
+  of ``str()`` of whatever the value happened to be.
+- ``set_key``: change one top-level key of a note's own front matter and
+  leave every other line (comments, quoting, order) exactly as written.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+from datetime import date, datetime
+from typing import Any, Iterable
+
+
+class Error(ValueError):
+    """Malformed front matter (wraps the YAML parser's error)."""
+
+
+# ─── Loading ──────────────────────────────────────────────────────────────────
+
+_RE_LINE  = re.compile(r"([A-Za-z_][\w-]*):(?:[ ]+(.*?))?[ ]*\Z")
+_RE_INT   = re.compile(r"-?(?:0|[1-9][0-9]*)\Z")
+_RE_FLOAT = re.compile(r"-?[0-9]+\.[0-9]+\Z")
+_RE_DATE  = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}\Z")
+# Plain scalars that can only be strings: a letter (or a "/" / "./" path)
+# first, nothing that starts a comment, a mapping, a flow collection or a
+# quoted / escaped run.
+_RE_PLAIN = re.compile(r"(?:[^\W\d_]|\.?/)[\w .,;()/+'?!=~&%@-]*\Z")
+_RE_PLAIN_FLOW = re.compile(r"(?:[^\W\d_]|\.?/)[\w .;()/+'?!=~&%@-]*\Z")
+_RE_DQ    = re.compile(r'"([^"\\]*)"\Z')
+_RE_SQ    = re.compile(r"'([^']*)'\Z")
+_RE_ITEM  = re.compile(r"""[ ]*(?:"([^"\\]*)"|'([^']*)'|([^,"'\[\]{}]*?))[ ]*(?:,|\Z)""")
+
+
+def _cases(*words: str) -> frozenset[str]:
+    # YAML 1.1 (as PyYAML resolves it): yes / Yes / YES, never yEs.
+    return frozenset(v for w in words for v in (w, w.capitalize(), w.upper()))
+
+
+_TRUE = _cases("yes", "true", "on")
+_FALSE = _cases("no", "false", "off")
+_NULL = _cases("null") | {"~"}
+_RESERVED = _TRUE | _FALSE | _NULL   # keys that would not load back as strings
+
+_NO = object()   # "not a simple scalar": parse_flat gives up
+
+
+def _plain(v: str, flow: bool = False) -> Any:
+    if v in _TRUE:
+        return True
+    if v in _FALSE:
+        return False
+    if v in _NULL:
+        return None
+    if _RE_INT.match(v):
+        return int(v)
+    if _RE_FLOAT.match(v):
+        return float(v)
+    if _RE_DATE.match(v):
+        try:
+            return date.fromisoformat(v)
+        except ValueError:
+            return _NO
+    if (_RE_PLAIN_FLOW if flow else _RE_PLAIN).match(v) and ": " not in v:
+        return v
+    return _NO
+
+
+def _value(v: str) -> Any:
+    m = _RE_DQ.match(v)
+    if m:
+        return m.group(1)
+    m = _RE_SQ.match(v)
+    if m:
+        return m.group(1)
+    if v[0] != "[":
+        return _plain(v)
+    if v[-1] != "]":
+        return _NO
+    inner, items, pos = v[1:-1], [], 0
+    if not inner.strip():
+        return items
+    while pos < len(inner):
+        m = _RE_ITEM.match(inner, pos)
+        if m is None or m.end() == pos:
+            return _NO
+        dq, sq, plain = m.groups()
+        if plain is None:
+            items.append(dq if dq is not None else sq)
+        else:
+            item = _plain(plain, flow=True) if plain else _NO
+            if item is _NO:
+                return _NO
+            items.append(item)
+        pos = m.end()
+    return items
+
+
+def parse_flat(block: str) -> dict[str, Any] | None:
+    """Hand parser for flat headers; None when the block needs a real YAML parser."""
+    fm: dict[str, Any] = {}
+    parent = None   # key of the last bare "key:" line: indented lines nest under it
+    indent = 0
+    for line in block.split("\n"):
+        if not line or line.lstrip(" ")[:1] == "#":
+            continue
+        n = len(line) - len(line.lstrip(" "))
+        if n:
+            if parent is None or (indent and n != indent):
+                return None
+            indent = n
+        else:
+            parent = None
+        m = _RE_LINE.match(line, n)
+        if m is None or m.group(1) in _RESERVED:
+            return None
+        key = m.group(1)
+        value = _value(m.group(2)) if m.group(2) else None
+        if value is _NO:
+            return None
+        if n:
+            if not isinstance(fm[parent], dict):
+                fm[parent] = {}
+            fm[parent][key] = value
+        else:
+            fm[key] = value
+            if not m.group(2):
+                parent, indent = key, 0
+    # An empty or comment-only header is None to safe_load, not {}.
+    return fm or None
+
+
+def _yaml_load(block: str) -> Any:
+    import yaml
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)   # no libyaml: pure Python
+    try:
+        return yaml.load(block, Loader=loader)
+    except (yaml.YAMLError, ValueError) as e:   # ValueError: e.g. date 2024-13-01
+        raise Error(str(e)) from e
+
+
+def load(block: str) -> Any:
+    """Parse a front-matter block (between the ``---`` fences), or a flat
+    YAML file. Raises ``Error`` for malformed input.
+    """
+    if "\t" not in block and "\r" not in block:
+        fm = parse_flat(block)
+        if fm is not None:
+            return fm
+    return _yaml_load(block)
+
+
+# ─── Emitting ─────────────────────────────────────────────────────────────────
+
+_RE_KEY = re.compile(r"[A-Za-z_][\w-]*\Z")
+# Characters YAML won't take raw even inside double quotes, plus the Unicode
+# line breaks (NEL, LS, PS) it would fold into spaces.
+_RE_UNPRINTABLE = re.compile("[\x7f-\x9f\u2028\u2029\ud800-\udfff\ufeff\ufffe\uffff]")
+
+
+def _quote(s: str) -> str:
+    # JSON string escapes are a subset of YAML's double-quoted ones.
+    q = json.dumps(s, ensure_ascii=False)
+    return _RE_UNPRINTABLE.sub(lambda m: f"\\u{ord(m.group()):04x}", q)
+
+
+def scalar(v: Any) -> str:
+    """One value on one line."""
+    if v is None:
+        return "null"
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    if isinstance(v, int):
+        return str(v)
+    if isinstance(v, float):
+        if math.isnan(v):
+            return ".nan"
+        if math.isinf(v):
+            return ".inf" if v > 0 else "-.inf"
+        return repr(v)
+    if isinstance(v, (date, datetime)):
+        # Unquoted: loads back as a date / datetime, not a string.
+        return v.isoformat()
+    return _quote(str(v))
+
+
+def _key(k: Any) -> str:
+    return k if isinstance(k, str) and _RE_KEY.match(k) and k not in _RESERVED else scalar(k)
+
+
+def _literal(s: str, indent: int) -> str | None:
+    """``|`` block for a multi-line string, or None when quoting is safer."""
+    lines = s.split("\n")
+    if "\r" in s or not s.strip() or any(ln.isspace() for ln in lines):
+        return None
+    if _RE_UNPRINTABLE.search(s):
+        return None
+    if not s.endswith("\n"):
+        chomp = "-"
+    else:
+        lines.pop()
+        chomp = "+" if s.endswith("\n\n") else ""
+    # Leading spaces on the first text line would be read as indentation.
+    hint = "2" if next(ln for ln in lines if ln).startswith(" ") else ""
+    pad = " " * indent
+    return f"|{hint}{chomp}\n" + "\n".join(pad + ln if ln else "" for ln in lines)
+
+
+def _inline(v: Any) -> bool:
+    return not isinstance(v, (dict, list, tuple)) and not (isinstance(v, str) and "\n" in v)
+
+
+def _node(v: Any, indent: int) -> str:
+    """The part after ``key:`` or ``-``: " value" inline, or "\\n" + a block."""
+    if isinstance(v, dict):
+        if not v:
+            return " {}"
+        return "\n" + "\n".join(_entry(k, x, indent) for k, x in v.items())
+    if isinstance(v, (list, tuple)):
+        if all(_inline(x) for x in v):
+            return f" [{', '.join(scalar(x) for x in v)}]"
+        return "\n" + "\n".join(_seq_item(x, indent) for x in v)
+    if isinstance(v, str) and "\n" in v:
+        block = _literal(v, indent)
+        return f" {block}" if block is not None else f" {scalar(v)}"
+    return f" {scalar(v)}"
+
+
+def _entry(k: Any, v: Any, indent: int) -> str:
+    return f"{' ' * indent}{_key(k)}:{_node(v, indent + 2)}"
+
+
+def _seq_item(v: Any, indent: int) -> str:
+    pad = " " * indent
+    if isinstance(v, dict) and v:
+        # "- first: x" then the other keys aligned under "first".
+        body = "\n".join(_entry(k, x, indent + 2) for k, x in v.items())
+        return f"{pad}- {body[indent + 2:]}"
+    return f"{pad}-{_node(v, indent + 2)}"
+
+
+def dump(fm: dict[str, Any], first: Iterable[str] = ()) -> str:
+    """Front matter body (no ``---`` fences, no final newline); ``first`` keys lead."""
+    first = [k for k in first if k in fm]
+    lead = set(first)
+    keys = first + [k for k in fm if k not in lead]
+    return "\n".join(_entry(k, fm[k], 0) for k in keys)
+
+
+# ─── Editing ──────────────────────────────────────────────────────────────────
+
+_RE_COMMENT = re.compile(r"[ \t]+#")
+
+
+def _comment(line: str) -> str:
+    # The trailing " # ..." of a one-line entry: the first "#" after blanks
+    # whose removal leaves the entry loading the same (so not one inside quotes).
+    for m in _RE_COMMENT.finditer(line):
+        try:
+            if load(line[:m.start()]) == load(line):
+                return line[m.start():]
+        except Error:
+            pass
+    return ""
+
+
+def set_key(block: str, key: str, value: Any) -> str:
+    """``block`` with top-level ``key`` set to ``value`` (appended if absent),
+    all other lines untouched and a trailing ``# comment`` on its line kept.
+    Raises ``Error`` unless the result loads back as the original mapping
+    with only ``key`` changed.
+    """
+    line = f"{_key(key)}: {scalar(value)}"
+    lines = block.split("\n")
+    for i, ln in enumerate(lines):
+        eol = "\r" if ln.endswith("\r") else ""
+        m = _RE_LINE.match(ln[:len(ln) - len(eol)])
+        if m and m.group(1) == key:
+            lines[i] = line + _comment(m.group(0)) + eol
+            break
+    else:
+        at = len(lines) - 1 if lines[-1] == "" else len(lines)   # before the final newline
+        eol = "\r" if at and lines[at - 1].endswith("\r") else ""
+        lines.insert(at, line + eol)
+    out = "\n".join(lines)
+    before = load(block)
+    if before is None:
+        before = {}
+    if not isinstance(before, dict) or load(out) != {**before, key: value}:
+        raise Error(f"cannot set {key!r} in place (multi-line value?)")
+    return out
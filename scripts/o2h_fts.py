@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+o2h_fts.py
+==========
+Local full-text index of the vault for ``o2h search`` (SQLite FTS5).
+
+The database sits next to the manifest (``<cache_dir>/vault.db``). Every
+search first refreshes it: a stat per note, and only notes whose source (or
+converted output) moved are read and re-indexed. Each note is stored as
+
+- ``title``, ``prose`` and ``code`` columns of an FTS5 table — fenced code
+  blocks apart, so a query can be limited to commands;
+- ``fields`` rows (name, lower-cased value) from its front matter, merged with
+  the converted output's, so auto-extracted ``tools`` / ``platforms`` /
+  ``difficulties`` filter too.
+
+Query syntax (one argv element per term)::
+
+    ligolo tun*            all terms, "*" = prefix
+    "ip route add"         a phrase (or any term containing a space)
+    NOT windows            exclude (argparse would take "-windows" for a flag)
+    tags:tryhackme         front-matter filter; tools:lig* prefix-matches
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+import o2h_frontmatter
+import o2h_lex
+
+SCHEMA = 2   # PRAGMA user_version; a mismatch rebuilds the database
+
+_RE_FILTER = re.compile(r"([A-Za-z_][\w-]*):(?!//)(.+)\Z")
+
+_DDL = """
+CREATE TABLE notes(id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, root TEXT NOT NULL,
+                   st TEXT NOT NULL, title TEXT NOT NULL);
+CREATE TABLE fields(note INTEGER NOT NULL, name TEXT NOT NULL, value TEXT NOT NULL);
+CREATE INDEX fields_name_value ON fields(name, value);
+CREATE INDEX fields_note ON fields(note);
+CREATE VIRTUAL TABLE text USING fts5(title, prose, code,
+                                     tokenize = 'unicode61 remove_diacritics 2');
+"""
+
+# bm25 column weights: title, prose, code.
+_RANK = "bm25(text, 10.0, 1.0, 1.0)"
+
+
+class QueryError(ValueError):
+    """A query the index can't answer (e.g. only exclusions)."""
+
+
+@dataclass
+class Hit:
+    path: str
+    title: str
+    snippet: str
+    rank: float
+
+
+def _stat(path: str | None) -> list[int] | None:
+    if path is None:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def _split(text: str) -> tuple[dict[str, Any], str, str]:
+    """Front matter, prose and code of one note."""
+    fm: Any = {}
+    m = o2h_lex.RE_FRONTMATTER.match(text)
+    if m:
+        try:
+            fm = o2h_frontmatter.load(m.group(1)) or {}
+        except o2h_frontmatter.Error:
+            fm = {}
+        text = text[m.end():]
+    prose, code = _code(text)
+    return fm if isinstance(fm, dict) else {}, prose, "\n".join(code)
+
+
+def _code(text: str) -> tuple[str, list[str]]:
+    """Prose and fenced code blocks, split where the converter's lexer splits
+    them (o2h_lex's openers and closers; an unclosed fence runs to the end).
+    """
+    prose: list[str] = []
+    code: list[str] = []
+    pos = scan = 0
+    while (m := o2h_lex.RE_BLOCK.search(text, scan)) is not None:
+        fence = m.group("fence")
+        scan = m.end()
+        if not fence or o2h_lex.inline_fence(fence, m.group("info")):
+            continue   # a callout header, or ```foo``` inline code
+        prose.append(text[pos:m.start()])
+        close = o2h_lex.fence_closer(fence).search(text, m.end())
+        if close is None:
+            code.append(text[m.end():])
+            return "\n".join(prose), code
+        code.append(text[m.end():close.start()])
+        pos = scan = close.end()
+    prose.append(text[pos:])
+    return "\n".join(prose), code
+
+
+def _header(path: str | None) -> dict[str, Any]:
+    """Front matter of a converted output, {} if there is none."""
+    if path is None:
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            head = f.read(64 * 1024)
+    except (OSError, UnicodeDecodeError):
+        return {}
+    return _split(head)[0] if head.startswith("---") else {}
+
+
+def _field_rows(fm: dict[str, Any]) -> Iterator[tuple[str, str]]:
+    for name, value in fm.items():
+        for v in value if isinstance(value, (list, tuple)) else [value]:
+            if v is not None and not isinstance(v, (dict, list)):
+                yield str(name).lower(), str(v).lower()
+
+
+def _phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def parse_query(terms: Iterable[str], code_only: bool = False) -> tuple[str | None, list]:
+    """``(FTS5 MATCH expression or None, [(field, value)])`` for argv terms."""
+    col = "code : " if code_only else ""
+    include: list[str] = []
+    exclude: list[str] = []
+    filters: list[tuple[str, str]] = []
+    negate = False
+    for raw in terms:
+        term = raw.strip()
+        quoted = len(term) > 1 and term[0] == term[-1] == '"'
+        term = term.strip('"').strip()
+        if not term:
+            continue
+        if term == "NOT" and not quoted:
+            negate = True
+            continue
+        m = None if quoted else _RE_FILTER.match(term)
+        if m:
+            filters.append((m.group(1).lower(), m.group(2).strip().lower()))
+            continue
+        phrase = quoted or " " in term
+        target, negate = (exclude if negate else include), False
+        prefix = not phrase and term.endswith("*") and len(term) > 1
+        expr = _phrase(term.rstrip("*") if prefix else term) + ("*" if prefix else "")
+        target.append(col + expr)
+    if negate:
+        raise QueryError("NOT needs a term after it")
+    if exclude and not include:
+        raise QueryError("a query can't only exclude — add a term or a field:value filter")
+    match = " AND ".join(include) or None
+    for expr in exclude:
+        match = f"({match}) NOT {expr}"
+    return match, filters
+
+
+class VaultIndex:
+    """The FTS5 database at ``db_path``."""
+
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA:
+            self._create()
+
+    def _create(self) -> None:
+        with self.db:
+            for (name,) in self.db.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' "
+                    "AND name IN ('notes', 'fields', 'text')").fetchall():
+                self.db.execute(f"DROP TABLE {name}")
+            try:
+                self.db.executescript(_DDL)
+            except sqlite3.OperationalError as e:   # SQLite built without FTS5
+                raise RuntimeError(f"this Python's SQLite can't do full-text search: {e}") from e
+            self.db.execute(f"PRAGMA user_version = {SCHEMA}")
+
+    def close(self) -> None:
+        self.db.close()
+
+    def refresh(self, files: Iterable[tuple[str, str, str | None]],
+                title: Callable[[str], str]) -> tuple[int, int]:
+        """Sync with ``(path, root, converted output or None)`` for every note
+        under the roots given; return (re-indexed, removed).
+
+        ``title(path)`` names a note without a front-matter title.
+        """
+        known = {path: (nid, st) for nid, path, st in
+                 self.db.execute("SELECT id, path, st FROM notes")}
+        roots: set[str] = set()
+        seen: set[str] = set()
+        updated = 0
+        with self.db:
+            for path, root, out in files:
+                roots.add(root)
+                seen.add(path)
+                st = json.dumps([_stat(path), _stat(out)])
+                old = known.get(path)
+                if old is not None and old[1] == st:
+                    continue
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        fm, prose, code = _split(f.read())
+                except (OSError, UnicodeDecodeError):
+                    continue
+                fm = {**fm, **_header(out)}
+                name = str(fm.get("title") or title(path))
+                if old is not None:
+                    self._delete(old[0])
+                nid = self.db.execute("INSERT INTO notes(path, root, st, title) VALUES (?, ?, ?, ?)",
+                                      (path, root, st, name)).lastrowid
+                self.db.execute("INSERT INTO text(rowid, title, prose, code) VALUES (?, ?, ?, ?)",
+                                (nid, name, prose, code))
+                self.db.executemany("INSERT INTO fields(note, name, value) VALUES (?, ?, ?)",
+                                    ((nid, n, v) for n, v in _field_rows(fm)))
+                updated += 1
+            gone = [nid for path, (nid, _) in known.items()
+                    if path not in seen and self._root_of(nid) in roots]
+            for nid in gone:
+                self._delete(nid)
+        return updated, len(gone)
+
+    def _root_of(self, nid: int) -> str:
+        return self.db.execute("SELECT root FROM notes WHERE id = ?", (nid,)).fetchone()[0]
+
+    def _delete(self, nid: int) -> None:
+        self.db.execute("DELETE FROM notes WHERE id = ?", (nid,))
+        self.db.execute("DELETE FROM text WHERE rowid = ?", (nid,))
+        self.db.execute("DELETE FROM fields WHERE note = ?", (nid,))
+
+    def search(self, terms: Iterable[str], roots: Iterable[str], code_only: bool = False,
+               limit: int = 10, mark: tuple[str, str] = ("[", "]")) -> list[Hit]:
+        """Best ``limit`` notes under ``roots`` for the query terms (see module doc)."""
+        match, filters = parse_query(terms, code_only)
+        if match is None and not filters:
+            raise QueryError("empty query")
+        roots = list(roots)
+        where = [f"n.root IN ({', '.join('?' * len(roots))})"]
+        args: list[Any] = list(roots)
+        for name, value in filters:
+            if value.endswith("*"):
+                op = "LIKE ? ESCAPE '\\'"
+                value = re.sub(r"([%_\\])", r"\\\1", value[:-1]) + "%"
+            else:
+                op = "= ?"
+            where.append(f"EXISTS (SELECT 1 FROM fields f WHERE f.note = n.id "
+                         f"AND f.name = ? AND f.value {op})")
+            args += [name, value]
+        if match is None:
+            sql = (f"SELECT n.path, n.title, '', 0 FROM notes n WHERE {' AND '.join(where)} "
+                   f"ORDER BY n.title COLLATE NOCASE LIMIT ?")
+        else:
+            col = 2 if code_only else -1
+            sql = (f"SELECT n.path, n.title, snippet(text, {col}, ?, ?, '…', 16), {_RANK} "
+                   f"FROM text JOIN notes n ON n.id = text.rowid "
+                   f"WHERE text MATCH ? AND {' AND '.join(where)} ORDER BY {_RANK} LIMIT ?")
+            args = [*mark, match, *args]
+        try:
+            rows = self.db.execute(sql, [*args, limit]).fetchall()
+        except sqlite3.OperationalError as e:
+            raise QueryError(str(e)) from e
+        return [Hit(path, title, " ".join(snippet.split()), rank)
+                for path, title, snippet, rank in rows]
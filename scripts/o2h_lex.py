@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+o2h_lex.py
+==========
+The Markdown block grammar every tool that splits a note agrees on: the
+front-matter header, fence openers and callout headers, and fence closers.
+
+The converter's body lexer, the full-text index (``o2h_fts``) and the PDF
+renderer (``o2h_pdf``) all cut notes with these patterns, so code, prose
+and front matter are the same spans for search as for conversion.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+
+RE_FRONTMATTER = re.compile(r"^---\s*\n(.*?\n)---\s*\n?", re.DOTALL)
+# Block starts for the body lexer: a fence opener or a callout header.
+RE_BLOCK = re.compile(
+    r"^(?:[ \t]*(?P<fence>`{3,}|~{3,})(?P<info>[^\n]*)"
+    r"|> \[!(?P<kind>\w+)\][ \t]*(?P<title>[^\n]*))\n?",
+    re.MULTILINE,
+)
+
+
+@functools.lru_cache(maxsize=None)
+def fence_closer(fence: str) -> re.Pattern:
+    """Closing line for an opener: same char, at least as long, nothing else
+    (a CRLF note's "\\r" included: ``$`` only stops before "\\n").
+    """
+    return re.compile(rf"^[ \t]*{re.escape(fence[0])}{{{len(fence)},}}[ \t]*\r?$", re.MULTILINE)
+
+
+def inline_fence(fence: str, info: str) -> bool:
+    """```foo``` on one line is inline code, not a fence opener."""
+    return fence[0] == "`" and "`" in info
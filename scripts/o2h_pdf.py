@@ -0,0 +1,694 @@
+#!/usr/bin/env python3
+"""
+o2h_pdf.py
+==========
+Markdown → PDF for the docs, ``mimo_methodology.md`` and selected posts.
+
+    python3 scripts/o2h_pdf.py docs/*.md mimo_methodology.md
+    python3 scripts/o2h_pdf.py --profile guide -o build/pdf 'content/posts/**/*.md'
+    python3 scripts/o2h_pdf.py --list-profiles
+
+Each document renders in its own worker process (WeasyPrint holds the GIL).
+Inputs are fingerprinted — source bytes, profile stylesheet, Markdown
+extensions, title, library versions — and:
+
+- the Markdown → HTML step is cached under that key in the cache dir;
+- a PDF whose key and on-disk stat match the last build is not rendered
+  again, so re-running over an unchanged tree costs a hash per file.
+
+Profiles are the stylesheets in ``scripts/pdf/`` plus the Markdown setup
+each was written for (``PROFILES``).
+
+Fonts never come from the network at render time. A profile names its
+families and weights; they are looked up as ``Family-Weight[Italic].ttf``
+(``JetBrainsMono-Medium.ttf``; also .otf / .woff / .woff2) in
+``scripts/pdf/fonts/`` and in ``<cache-dir>/fonts/``, which ``--fetch-fonts``
+fills once from Google Fonts. Found files become ``@font-face`` rules;
+families with no files fall back to the system's fontconfig. WeasyPrint
+embeds only the glyphs a document uses. Each worker process keeps one
+``FontConfiguration`` and the parsed profile stylesheets for all its documents.
+
+``--split`` (needs pypdf) renders big documents chapter by chapter: the
+Markdown is cut at every H1, where the stylesheets start a new page anyway,
+the chapters render in parallel and each chapter's PDF is cached by its
+content — after editing one chapter only that chapter is rendered again.
+The parts are joined behind a contents page, and the footer is stamped
+from one blank render of the whole page count, so ``counter(page)`` /
+``counter(pages)`` run across the document; running headers come from each
+chapter's own H1. Links and footnote numbers do not cross chapters.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import glob
+import hashlib
+import html
+import io
+import json
+import logging
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import o2h_frontmatter
+import o2h_lex
+import o2h_util
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+CACHE_DIR = ROOT / ".cache" / "o2h" / "pdf"
+FONT_DIR = HERE / "pdf" / "fonts"
+log = o2h_util.log
+FORMAT = 2   # bump when the HTML wrapper or the cache layout changes
+
+
+@dataclass(frozen=True)
+class Profile:
+    css: str                                   # file in scripts/pdf/
+    footer: str                                # @bottom-center content; {title} is filled in
+    extensions: tuple[str, ...]
+    extension_configs: dict[str, dict[str, Any]] = field(default_factory=dict)
+    fonts: dict[str, tuple[int, ...]] = field(default_factory=dict)   # family → weights
+
+
+PROFILES: dict[str, Profile] = {
+    "writers": Profile(
+        css="writers.css",
+        footer='"Hri7hik H4cks  —  {title}  —  page " counter(page) " / " counter(pages)',
+        extensions=("extra", "sane_lists", "smarty", "toc", "codehilite"),
+        extension_configs={"codehilite": {"css_class": "codehilite", "guess_lang": False}},
+        fonts={"Inter": (400, 500, 600, 700), "JetBrains Mono": (400, 500)},
+    ),
+    "guide": Profile(
+        css="guide.css",
+        footer='"{title} - Page " counter(page)',
+        extensions=("markdown.extensions.toc", "markdown.extensions.tables",
+                    "markdown.extensions.fenced_code", "markdown.extensions.codehilite"),
+    ),
+}
+DEFAULT_PROFILE = "writers"
+
+
+@dataclass
+class Job:
+    src: Path
+    dest: Path
+    profile: str
+    title: str
+    key: str = ""
+    fonts: str = ""   # @font-face rules for the profile's local font files
+    split: bool = False                              # render per chapter (--split)
+    parts: list[str] = field(default_factory=list)   # cached part keys of a split build
+
+
+def _version(dist: str) -> str | None:
+    try:
+        return metadata.version(dist)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def _css_digest(name: str) -> str:
+    return o2h_util.sha1((HERE / "pdf" / name).read_bytes())
+
+
+def _css_string(s: str) -> str:
+    return s.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _split(text: str) -> tuple[dict[str, Any], str]:
+    """Front matter (posts carry one) and the Markdown body."""
+    m = o2h_lex.RE_FRONTMATTER.match(text)
+    if not m:
+        return {}, text
+    try:
+        fm = o2h_frontmatter.load(m.group(1)) or {}
+    except o2h_frontmatter.Error:
+        fm = {}
+    return fm if isinstance(fm, dict) else {}, text[m.end():]
+
+
+# ─── Fonts ────────────────────────────────────────────────────────────────────
+
+_WEIGHTS = {"thin": 100, "extralight": 200, "light": 300, "regular": 400, "medium": 500,
+            "semibold": 600, "bold": 700, "extrabold": 800, "black": 900}
+_WEIGHT_NAMES = {v: k for k, v in _WEIGHTS.items()}
+_WEIGHT_NAMES.update({200: "ExtraLight", 600: "SemiBold", 800: "ExtraBold"})
+_FONT_SUFFIXES = (".ttf", ".otf", ".woff", ".woff2")
+_RE_FONT_FILE = re.compile(r"(?P<family>\w+?)-(?P<weight>[A-Za-z]*?)(?P<italic>Italic)?\Z")
+_RE_FACE = re.compile(r"@font-face\s*\{(.*?)\}", re.DOTALL)
+
+
+def _face_name(weight: int, italic: bool = False) -> str:
+    name = _WEIGHT_NAMES.get(weight, str(weight))
+    return f"{name[:1].upper()}{name[1:]}{'Italic' if italic else ''}"
+
+
+def font_files(dirs: Iterable[Path]) -> dict[tuple[str, int, str], Path]:
+    """``(squashed family, weight, style) → file`` for every font in ``dirs``;
+    the first directory wins.
+    """
+    found: dict[tuple[str, int, str], Path] = {}
+    for d in dirs:
+        try:
+            entries = sorted(d.iterdir())
+        except OSError:
+            continue
+        for f in entries:
+            m = _RE_FONT_FILE.match(f.stem)
+            if f.suffix.lower() not in _FONT_SUFFIXES or m is None:
+                continue
+            weight = _WEIGHTS.get((m.group("weight") or "regular").lower())
+            if weight is None:
+                continue
+            style = "italic" if m.group("italic") else "normal"
+            found.setdefault((m.group("family").lower(), weight, style), f)
+    return found
+
+
+def font_faces(profile: Profile, dirs: Iterable[Path]) -> tuple[str, list[str]]:
+    """``@font-face`` rules for the profile's families, and the families with
+    no local file at all (those are left to fontconfig).
+    """
+    files = font_files(dirs)
+    rules, missing = [], []
+    for family, weights in profile.fonts.items():
+        key = family.replace(" ", "").lower()
+        faces = sorted((w, st, f) for (fam, w, st), f in files.items() if fam == key)
+        if not faces:
+            missing.append(family)
+            continue
+        for weight, style, f in faces:
+            st = f.stat()
+            # Size + mtime in a comment: a replaced font file changes the key.
+            rules.append(f'@font-face {{ font-family: "{family}"; font-weight: {weight}; '
+                         f'font-style: {style}; src: url("{f.as_uri()}"); }} '
+                         f"/* {st.st_size} {st.st_mtime_ns} */")
+        have = {w for w, _, _ in faces}
+        absent = [w for w in weights if w not in have]
+        if absent:
+            log.debug(f"{family}: no local file for weight(s) {absent} — synthesized")
+    return "\n".join(rules), missing
+
+
+def fetch_fonts(dest: Path, profiles: Iterable[Profile] | None = None) -> int:
+    """Download the profiles' families from Google Fonts into ``dest`` once
+    (as TTF, named for ``font_files``); return how many files were fetched.
+    """
+    import urllib.request
+
+    wanted: dict[str, set[int]] = {}
+    for p in profiles or PROFILES.values():
+        for family, weights in p.fonts.items():
+            wanted.setdefault(family, set()).update(weights)
+    dest.mkdir(parents=True, exist_ok=True)
+    fetched = 0
+    for family, weights in sorted(wanted.items()):
+        url = (f"https://fonts.googleapis.com/css2?family={family.replace(' ', '+')}"
+               f":wght@{';'.join(map(str, sorted(weights)))}")
+        # A non-browser User-Agent is served one plain TTF per face.
+        req = urllib.request.Request(url, headers={"User-Agent": "o2h-pdf"})
+        with urllib.request.urlopen(req, timeout=30) as r:
+            css = r.read().decode("utf-8")
+        for block in _RE_FACE.findall(css):
+            weight = re.search(r"font-weight:\s*(\d+)", block)
+            italic = re.search(r"font-style:\s*italic", block) is not None
+            src = re.search(r"url\((https://[^)]+)\)", block)
+            if not (weight and src):
+                continue
+            suffix = Path(src.group(1)).suffix or ".ttf"
+            name = f"{family.replace(' ', '')}-{_face_name(int(weight.group(1)), italic)}"
+            target = dest / f"{name}{suffix}"
+            if target.exists():
+                continue
+            with urllib.request.urlopen(src.group(1), timeout=30) as r:
+                data = r.read()
+            o2h_util.write_atomic(target, lambda t: t.write_bytes(data))
+            fetched += 1
+            log.info(f"Fetched {target.name} ({len(data) // 1024} KB)")
+    return fetched
+
+
+# ─── Planning ─────────────────────────────────────────────────────────────────
+
+def plan(inputs: Iterable[str], profile: str, out_dir: Path | None,
+         title: str | None = None) -> list[Job]:
+    """Expand files, directories (every .md below) and globs (``**`` recurses)
+    into jobs, in order, deduplicated.
+    """
+    jobs: list[Job] = []
+    seen: set[Path] = set()
+    for pattern in inputs:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        elif os.path.isdir(pattern):
+            matches = sorted(str(p) for p in Path(pattern).rglob("*.md"))
+        else:
+            matches = [pattern]
+        if not matches:
+            log.warning(f"No match: {pattern}")
+        for m in matches:
+            src = Path(m).resolve()
+            if src in seen or not src.is_file():
+                if not src.exists():
+                    log.warning(f"Not found: {m}")
+                continue
+            seen.add(src)
+            dest = (out_dir / src.name if out_dir else src).with_suffix(".pdf")
+            jobs.append(Job(src, dest, profile, title or ""))
+    return jobs
+
+
+def _setup(job: Job) -> dict[str, Any]:
+    """Everything besides the text that goes into a rendering."""
+    p = PROFILES[job.profile]
+    return {
+        "v": FORMAT, "css": _css_digest(p.css), "footer": p.footer,
+        "ext": p.extensions, "ext_cfg": p.extension_configs, "fonts": job.fonts,
+        "base": str(job.src.parent),
+        "lib": [_version("markdown"), _version("weasyprint"), _version("pygments")],
+    }
+
+
+def _key(parts: dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def fingerprint(job: Job, raw: bytes) -> tuple[str, str]:
+    """(cache key, title) for one job: everything that can change its PDF."""
+    fm, _ = _split(raw.decode("utf-8"))
+    title = job.title or str(fm.get("title") or o2h_util.title_from_filename(job.src.stem))
+    return _key({**_setup(job), "src": o2h_util.sha1(raw), "title": title, "split": job.split}), title
+
+
+# ─── Worker side ──────────────────────────────────────────────────────────────
+
+# Per worker process, reused by every document it renders.
+_md: dict[str, Any] = {}       # profile → markdown.Markdown
+_font_config = None            # weasyprint FontConfiguration
+_sheets: dict[tuple[str, str], Any] = {}   # (profile, @font-face rules) → parsed CSS
+
+
+def _footer_css(job: Job) -> str:
+    footer = PROFILES[job.profile].footer.format(title=_css_string(job.title))
+    return f"@page {{ @bottom-center {{ content: {footer}; }} }}"
+
+
+def _stylesheets(job: Job, page_css: str) -> tuple[Any, list]:
+    """This process's FontConfiguration and the job's stylesheets (profile
+    ones parsed once per profile, then ``page_css``).
+    """
+    global _font_config
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    if _font_config is None:
+        _font_config = FontConfiguration()
+    p = PROFILES[job.profile]
+    base = _sheets.get((job.profile, job.fonts))
+    if base is None:
+        base = _sheets[job.profile, job.fonts] = [
+            CSS(string=job.fonts, font_config=_font_config),
+            CSS(filename=str(HERE / "pdf" / p.css), font_config=_font_config),
+        ]
+    return _font_config, [*base, CSS(string=page_css, font_config=_font_config)]
+
+
+def pdf_bytes(job: Job, page: str, page_css: str | None = None) -> bytes:
+    """Render one job's HTML with the process-wide font setup; ``page_css``
+    defaults to the profile's footer.
+    """
+    from weasyprint import HTML
+
+    fonts, sheets = _stylesheets(job, _footer_css(job) if page_css is None else page_css)
+    return HTML(string=page, base_url=str(job.src.parent)).write_pdf(stylesheets=sheets,
+                                                                     font_config=fonts)
+
+
+def _to_html(job: Job, text: str) -> str:
+    import markdown
+
+    p = PROFILES[job.profile]
+    md = _md.get(job.profile)
+    if md is None:
+        md = _md[job.profile] = markdown.Markdown(extensions=list(p.extensions),
+                                                 extension_configs=p.extension_configs)
+    body = md.reset().convert(_split(text)[1])
+    return (f'<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+            f"<title>{html.escape(job.title)}</title>\n</head>\n"
+            f"<body>\n{body}\n</body>\n</html>\n")
+
+
+def render(job: Job, cache_dir: Path) -> tuple[str, str, float]:
+    """Write one PDF; return (dest, cache note, seconds)."""
+    t0 = time.perf_counter()
+    cached = cache_dir / "html" / f"{job.key}.html"
+    try:
+        page, hit = cached.read_text(encoding="utf-8"), True
+    except OSError:
+        page, hit = _to_html(job, job.src.read_text(encoding="utf-8")), False
+        o2h_util.write_if_changed(cached, page.encode("utf-8"))
+
+    data = pdf_bytes(job, page)
+    job.dest.parent.mkdir(parents=True, exist_ok=True)
+    o2h_util.write_atomic(job.dest, lambda t: t.write_bytes(data))
+    return str(job.dest), "cached HTML" if hit else "", time.perf_counter() - t0
+
+
+def render_chapter(job: Job, text: str, first: bool, out: Path) -> None:
+    """Write one chapter of a split build to ``out``, without the footer."""
+    page, css = _to_html(job, text), ""
+    if not first:
+        page = page.replace("<body>\n", "<body>\n" + _CONTINUED_HTML, 1)
+        css = _CONTINUED_CSS
+    data = pdf_bytes(job, page, css)
+    o2h_util.write_atomic(out, lambda t: t.write_bytes(data))
+
+
+# ─── Chapters (--split) ───────────────────────────────────────────────────────
+
+_RE_FENCE = re.compile(r" {0,3}(`{3,}|~{3,})")
+_RE_H1 = re.compile(r" {0,3}#[ \t]+(.+?)(?:[ \t]+#+)?[ \t]*$")
+_RE_LINK_DEF = re.compile(r" {0,3}\[[^\]^][^\]]*\]:[ \t]*\S")
+_RE_INLINE = re.compile(r"[*_`]|\s*\{[^}]*\}\s*$")
+# A chapter after the first opens with a hidden H1, so its own heading gets
+# the "not the first H1" rules and the first-page @page rules are undone —
+# it looks as it did mid-document.
+_CONTINUED_HTML = '<h1 style="display: none"></h1>\n'
+_CONTINUED_CSS = "@page :first { @top-right { content: string(chapter); } }"
+_OVERLAY_CSS = "@page { @top-right { content: none; } }"
+
+
+@dataclass
+class Chapter:
+    title: str
+    text: str
+    key: str = ""
+    pages: int = 0
+
+
+def chapters(body: str) -> list[Chapter]:
+    """Cut a Markdown body at its ATX H1 headings outside fenced code; text
+    before the first H1 stays with it. Link reference definitions are copied
+    into every chapter so ``[text][ref]`` keeps resolving.
+    """
+    titles, chunks = [""], [[]]
+    defs: list[str] = []
+    fence = ""
+    for line in body.splitlines(keepends=True):
+        m = _RE_FENCE.match(line)
+        if fence:
+            if m and m.group(1)[0] == fence[0] and len(m.group(1)) >= len(fence) \
+                    and not line[m.end():].strip():
+                fence = ""
+        elif m:
+            fence = m.group(1)
+        elif _RE_LINK_DEF.match(line):
+            defs.append(line)
+        else:
+            h = _RE_H1.match(line)
+            if h and titles[-1]:
+                titles.append("")
+                chunks.append([])
+            if h:
+                titles[-1] = _RE_INLINE.sub("", h.group(1)).strip() or h.group(1)
+        chunks[-1].append(line)
+    refs = "\n" + "".join(defs) if defs else ""
+    return [Chapter(t, "".join(c) + refs) for t, c in zip(titles, chunks)]
+
+
+def _contents(entries: list[tuple[str, int]]) -> str:
+    rows = []
+    for title, page in entries:
+        title = title.replace("|", r"\|")
+        rows.append(f"| {title} | {page} |")
+    return "# Contents\n\n| Chapter | Page |\n|:--|--:|\n" + "\n".join(rows) + "\n"
+
+
+def render_split(job: Job, cache_dir: Path, pool=None) -> tuple[str, str, float]:
+    """Write one PDF chapter by chapter (see the module docstring); chapters
+    go to ``pool`` when given. Return (dest, cache note, seconds).
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    t0 = time.perf_counter()
+    parts = chapters(_split(job.src.read_text(encoding="utf-8"))[1])
+    if len(parts) < 2:
+        return render(job, cache_dir)
+    out = cache_dir / "chapters"
+    out.mkdir(parents=True, exist_ok=True)
+    setup = _setup(job)
+    for i, ch in enumerate(parts):
+        ch.key = _key({**setup, "chapter": ch.text, "first": i == 0})
+    todo = [(ch.text, i == 0, out / f"{ch.key}.pdf") for i, ch in enumerate(parts)
+            if not (out / f"{ch.key}.pdf").exists()]
+    if pool is None:
+        for args in todo:
+            render_chapter(job, *args)
+    else:
+        for f in [pool.submit(render_chapter, job, *args) for args in todo]:
+            f.result()
+    for ch in parts:
+        ch.pages = len(PdfReader(out / f"{ch.key}.pdf").pages)
+
+    # The contents page follows the first chapter, so its own length shifts
+    # the numbers it prints: settle that in a render or two (cached as well).
+    contents = Chapter("Contents", "", pages=1)
+    for _ in range(3):
+        entries, page = [], 1 + parts[0].pages + contents.pages
+        for ch in parts[1:]:
+            entries.append((ch.title, page))
+            page += ch.pages
+        contents.text = _contents(entries)
+        contents.key = _key({**setup, "chapter": contents.text, "first": False})
+        path = out / f"{contents.key}.pdf"
+        if not path.exists():
+            render_chapter(job, contents.text, False, path)
+        n = len(PdfReader(path).pages)
+        if n == contents.pages:
+            break
+        contents.pages = n
+
+    # Footer (page x / y) for every page at once: blank pages, merged on top.
+    order = [parts[0], contents, *parts[1:]]
+    total = sum(ch.pages for ch in order)
+    overlay = out / f"{_key({**setup, 'title': job.title, 'overlay': total})}.pdf"
+    if not overlay.exists():
+        page_html = ('<!DOCTYPE html>\n<html class="o2h-overlay">\n<body>\n<div></div>\n'
+                     + '<div style="break-before: page"></div>\n' * (total - 1)
+                     + "</body>\n</html>\n")
+        data = pdf_bytes(job, page_html, f"{_footer_css(job)}\n{_OVERLAY_CSS}")
+        o2h_util.write_atomic(overlay, lambda t: t.write_bytes(data))
+
+    writer = PdfWriter()
+    for ch in order:
+        writer.append(out / f"{ch.key}.pdf")   # keeps each chapter's bookmarks
+    for pg, over in zip(writer.pages, PdfReader(overlay).pages):
+        pg.merge_page(over)
+    writer.add_metadata({"/Title": job.title})
+    buf = io.BytesIO()
+    writer.write(buf)
+    job.dest.parent.mkdir(parents=True, exist_ok=True)
+    o2h_util.write_atomic(job.dest, lambda t: t.write_bytes(buf.getvalue()))
+    job.parts = [ch.key for ch in order] + [overlay.stem]
+    cached = len(parts) - len(todo)
+    return str(job.dest), f"{cached}/{len(parts)} chapters cached", time.perf_counter() - t0
+
+
+# ─── Driver ───────────────────────────────────────────────────────────────────
+
+def build(jobs: list[Job], cache_dir: Path, workers: int = 0, force: bool = False,
+          font_dirs: Iterable[Path] | None = None) -> int:
+    """Render the stale jobs in parallel; return the process exit code.
+
+    ``font_dirs`` default to ``FONT_DIR`` and ``<cache_dir>/fonts``.
+    """
+    t0 = time.perf_counter()
+    dirs = list(font_dirs) if font_dirs is not None else [FONT_DIR, cache_dir / "fonts"]
+    faces: dict[str, str] = {}
+    for name in sorted({job.profile for job in jobs}):
+        faces[name], missing = font_faces(PROFILES[name], dirs)
+        if missing:
+            log.warning(f"No local font files for {', '.join(missing)} — using system fonts "
+                        f"(put them in {_rel(FONT_DIR)}/ or run --fetch-fonts)")
+    if any(job.split for job in jobs):
+        try:
+            import pypdf  # noqa: F401
+        except ImportError:
+            log.warning("--split needs pypdf (pip3 install pypdf) — rendering whole documents")
+            for job in jobs:
+                job.split = False
+    manifest_path = cache_dir / "manifest.json"
+    try:
+        manifest: dict[str, Any] = json.loads(manifest_path.read_bytes())
+    except (OSError, ValueError):
+        manifest = {}
+
+    stale: list[Job] = []
+    errors = fresh = rendered = 0
+    for job in jobs:
+        job.fonts = faces[job.profile]
+        try:
+            job.key, job.title = fingerprint(job, job.src.read_bytes())
+        except (OSError, UnicodeDecodeError) as e:
+            log.error(f"{job.src}: {e}")
+            errors += 1
+            continue
+        entry = manifest.get(str(job.dest))
+        try:
+            st = o2h_util.stat_key(job.dest.stat())
+        except OSError:
+            st = None
+        if force or not entry or entry.get("key") != job.key or entry.get("st") != st:
+            stale.append(job)
+        else:
+            fresh += 1
+            log.debug(f"up-to-date: {job.dest}")
+
+    if stale:
+        workers = workers or os.cpu_count() or 1
+        if not any(job.split for job in stale):   # split documents fan out per chapter
+            workers = min(workers, len(stale))
+        for job, res in _render_all(stale, cache_dir, workers):
+            if res is None:
+                errors += 1
+                manifest.pop(str(job.dest), None)
+                continue
+            dest, note, secs = res
+            st = job.dest.stat()
+            manifest[dest] = {"key": job.key, "st": o2h_util.stat_key(st)}
+            if job.parts:
+                manifest[dest]["parts"] = job.parts
+            rendered += 1
+            o2h_util.ok(f"{_rel(job.dest)} ({st.st_size / 1024:.1f} KB, "
+                    f"{secs:.1f}s{', ' + note if note else ''})")
+        o2h_util.write_if_changed(manifest_path, json.dumps(manifest, indent=1, sort_keys=True)
+                              .encode())
+        # HTML of documents since edited, or whose PDF failed or went away.
+        live = {e["key"] for e in manifest.values()}
+        for f in (cache_dir / "html").glob("*.html"):
+            if f.stem not in live:
+                f.unlink(missing_ok=True)
+        live = {k for e in manifest.values() for k in e.get("parts", ())}
+        for f in (cache_dir / "chapters").glob("*.pdf"):
+            if f.stem not in live:
+                f.unlink(missing_ok=True)
+
+    ms = int((time.perf_counter() - t0) * 1000)
+    summary = (f"{rendered}/{len(jobs)} PDF(s) rendered, {fresh} up-to-date in {ms}ms"
+               + (f" ({workers} worker(s))" if stale else ""))
+    if errors:
+        log.error(f"{summary}, {errors} failed")
+        return 1
+    o2h_util.ok(summary)
+    return 0
+
+
+def _render_all(jobs: list[Job], cache_dir: Path,
+                workers: int) -> Iterator[tuple[Job, tuple[str, str, float] | None]]:
+    """(job, render result or None on failure), in completion order. Split
+    documents are driven from here; their chapters share the pool.
+    """
+    whole = [job for job in jobs if not job.split]
+    split = [job for job in jobs if job.split]
+    if workers <= 1:
+        for job in whole:
+            yield job, _outcome(job, lambda: render(job, cache_dir))
+        for job in split:
+            yield job, _outcome(job, lambda: render_split(job, cache_dir))
+        return
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {pool.submit(render, job, cache_dir): job for job in whole}
+        for job in split:
+            yield job, _outcome(job, lambda: render_split(job, cache_dir, pool))
+        for f in as_completed(futures):
+            yield futures[f], _outcome(futures[f], f.result)
+
+
+def _outcome(job: Job, get) -> tuple[str, str, float] | None:
+    try:
+        return get()
+    except Exception as e:   # one bad document must not sink the batch
+        log.error(f"{job.src}: {type(e).__name__}: {e}")
+        return None
+
+
+def _rel(p: Path) -> str:
+    try:
+        return str(p.relative_to(Path.cwd()))
+    except ValueError:
+        return str(p)
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="o2h-pdf", description="Markdown → PDF (parallel, cached)")
+    ap.add_argument("inputs", nargs="*", metavar="FILE",
+                    help="Markdown files or globs ('**' recurses)")
+    ap.add_argument("-p", "--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                    help=f"Stylesheet profile (default: {DEFAULT_PROFILE})")
+    ap.add_argument("-o", "--out-dir", type=Path,
+                    help="Write PDFs here (default: next to each source)")
+    ap.add_argument("--title",
+                    help="Footer title (default: front-matter title, else the file name)")
+    ap.add_argument("-j", "--jobs", type=int, default=0,
+                    help="Worker processes (default: cpu_count, capped at documents)")
+    ap.add_argument("--cache-dir", type=Path, default=CACHE_DIR,
+                    help="HTML cache + build manifest (default: <repo>/.cache/o2h/pdf)")
+    ap.add_argument("--font-dir", type=Path, action="append", metavar="DIR",
+                    help="Look for font files here (repeatable; default: scripts/pdf/fonts "
+                         "and <cache-dir>/fonts)")
+    ap.add_argument("--fetch-fonts", action="store_true",
+                    help="Download the profiles' fonts into <cache-dir>/fonts once, then go on")
+    ap.add_argument("--split", action="store_true",
+                    help="Render each H1 chapter separately, in parallel and cached per "
+                         "chapter, then join them (needs pypdf)")
+    ap.add_argument("--force", action="store_true", help="Render even if up-to-date")
+    ap.add_argument("--list-profiles", action="store_true", help="Show profiles and exit")
+    ap.add_argument("-v", "--verbose", action="store_true", help="Debug logging")
+    args = ap.parse_args(argv)
+
+    o2h_util.setup_logging(args.verbose)
+    # Python-Markdown logs every extension it loads at DEBUG.
+    logging.getLogger("MARKDOWN").setLevel(logging.INFO)
+    if args.list_profiles:
+        for name, p in sorted(PROFILES.items()):
+            print(f"{name:8} scripts/pdf/{p.css}  ({', '.join(p.extensions)})")
+        return 0
+    if args.fetch_fonts:
+        try:
+            n = fetch_fonts(args.cache_dir / "fonts")
+        except OSError as e:
+            log.error(f"Fetching fonts failed: {e}")
+            return 1
+        o2h_util.ok(f"{n} font file(s) fetched into {_rel(args.cache_dir / 'fonts')}")
+        if not args.inputs:
+            return 0
+    if not args.inputs:
+        ap.error("no input files")
+
+    jobs = plan(args.inputs, args.profile, args.out_dir, args.title)
+    if not jobs:
+        log.error("Nothing to render")
+        return 1
+    for job in jobs:
+        job.split = args.split
+    dirs = None
+    if args.font_dir:
+        dirs = [*args.font_dir, FONT_DIR, args.cache_dir / "fonts"]
+    return build(jobs, args.cache_dir, args.jobs, args.force, dirs)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
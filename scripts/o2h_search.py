@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+o2h_search.py
+=============
+Sharded search index for the site, written by the converter.
+
+PaperMod's search downloads one index.json holding every post's full text
+before the first result shows. Here each converted note becomes a document
+(url, title, date, tools / platforms / difficulties) plus weighted terms,
+and the terms are split into shards by their first two characters:
+
+    static/search-index/docs.json      documents, shard list, tokenizer rules
+    static/search-index/s/<ab>.json    term → [[doc id, weight], …]
+
+The client (assets/js/sharded-search.js) loads docs.json, then only the
+shards its query terms start with.
+
+Updates are incremental: a changed note rewrites just the shards its old
+and new terms fall in. Which shards each note sits in is kept in the cache
+dir, not the manifest, so an up-to-date run never reads it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+FORMAT = 1   # bump when documents, shards or tokens change shape
+PREFIX = 2   # characters of a term that pick its shard
+FACETS = ("tools", "platforms", "difficulties")
+
+_RE_TERM = re.compile(r"\w+")
+# Shortcodes, comments, tags, link targets and bare URLs: markup, not prose.
+_RE_MARKUP = re.compile(r"\{\{[<%].*?[>%]\}\}|<!--.*?-->|<[^>]+>|\]\([^)]*\)|https?://\S+",
+                        re.DOTALL)
+_STOP = frozenset("""
+a an and are as at be but by can do for from has have how if in into is it its
+not of on or so than that the their then there these this to was we were what
+when which who will with you your
+""".split())
+_MAX_TERM = 32
+
+# Weight per occurrence by where the term was seen.
+_TITLE, _TAXONOMY, _BODY = 10, 5, 1
+_BODY_CAP = 10   # body hits counted per term: long notes don't drown short ones
+
+
+def tokens(text: str) -> Iterator[str]:
+    """Index terms of ``text``; the client applies the same rules to queries."""
+    for t in _RE_TERM.findall(text.lower()):
+        if 2 <= len(t) <= _MAX_TERM and t not in _STOP:
+            yield t
+
+
+def shard_key(term: str) -> str:
+    head = term[:PREFIX]
+    return head if head.isascii() and head.isalnum() else "_"
+
+
+def _as_list(v: Any) -> list[str]:
+    if v is None or v == "":
+        return []
+    return [str(x) for x in v] if isinstance(v, (list, tuple)) else [str(v)]
+
+
+def document(fm: dict[str, Any], body: str, url: str) -> dict[str, Any]:
+    """What the index keeps for one note: ``{"doc": display fields, "terms": {term: weight}}``."""
+    weights: dict[str, int] = {}
+    for t in tokens(_RE_MARKUP.sub(" ", body)):
+        weights[t] = weights.get(t, 0) + _BODY
+    for t in weights:
+        weights[t] = min(weights[t], _BODY_CAP * _BODY)
+    title = str(fm.get("title") or "")
+    for t in tokens(title):
+        weights[t] = weights.get(t, 0) + _TITLE
+    facets = {k: _as_list(fm.get(k)) for k in FACETS}
+    for v in (*_as_list(fm.get("tags")), *_as_list(fm.get("categories")),
+              *(x for vs in facets.values() for x in vs)):
+        for t in tokens(v):
+            weights[t] = weights.get(t, 0) + _TAXONOMY
+    doc = {"url": url, "title": title, "date": str(fm.get("date") or "")[:10]}
+    doc.update((k, v) for k, v in facets.items() if v)
+    return {"doc": doc, "terms": weights}
+
+
+def _dumps(data: Any) -> bytes:
+    # Served to browsers: compact, one line.
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _read(path: Path, default: Any) -> Any:
+    try:
+        return json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return default
+
+
+class ShardedIndex:
+    """The index under ``root`` plus its state file in ``cache_dir``.
+
+    ``write(path, data) -> bool`` is the caller's atomic write-if-changed.
+    """
+
+    def __init__(self, root: Path, cache_dir: Path, write: Callable[[Path, bytes], bool]):
+        self.root = root
+        # One state file per format and index location: either changing
+        # leaves no state behind, which reads as "rebuild".
+        where = hashlib.sha1(str(root.resolve()).encode()).hexdigest()[:8]
+        self.state_file = cache_dir / f"search-{FORMAT}-{where}.json"
+        self._write = write
+
+    def intact(self) -> bool:
+        """Index and state both on disk (two stats; nothing is read)."""
+        return self.state_file.is_file() and (self.root / "docs.json").is_file()
+
+    def reset(self) -> None:
+        """Forget the state: the next ``update`` starts an empty index and
+        drops every shard file it does not write."""
+        self.state_file.unlink(missing_ok=True)
+
+    def update(self, changes: dict[str, dict[str, Any] | None]) -> int:
+        """Apply ``{rel_key: document, or None when removed}``; return shards written."""
+        state = _read(self.state_file, {})
+        notes: dict[str, list] = state.get("notes", {})          # rel_key → [id, shard keys]
+        live: set[str] = set(state.get("shards", ()))
+        head = _read(self.root / "docs.json", {}) if notes else {}
+        table: list[dict | None] = head.get("docs", [])
+
+        changed: set[int] = set()
+        touched: set[str] = set()
+        fresh: dict[str, dict[str, list[list[int]]]] = {}   # shard → term → postings
+        free = (i for i, d in enumerate(table) if d is None)
+        for rel_key, new in sorted(changes.items()):
+            old = notes.pop(rel_key, None)
+            if old is not None:
+                changed.add(old[0])
+                touched.update(old[1])
+                table[old[0]] = None
+            if new is None:
+                continue
+            doc_id = old[0] if old is not None else next(free, None)
+            if doc_id is None:
+                doc_id = len(table)
+                table.append(None)
+            table[doc_id] = new["doc"]
+            changed.add(doc_id)
+            keys = set()
+            for term, weight in new["terms"].items():
+                key = shard_key(term)
+                keys.add(key)
+                fresh.setdefault(key, {}).setdefault(term, []).append([doc_id, weight])
+            notes[rel_key] = [doc_id, sorted(keys)]
+            touched |= keys
+        while table and table[-1] is None:
+            table.pop()
+
+        written = 0
+        shard_dir = self.root / "s"
+        for key in sorted(touched):
+            path = shard_dir / f"{key}.json"
+            shard = _read(path, {}) if key in live else {}
+            for term in list(shard):
+                kept = [p for p in shard[term] if p[0] not in changed]
+                if kept:
+                    shard[term] = kept
+                else:
+                    del shard[term]
+            for term, postings in fresh.get(key, {}).items():
+                shard.setdefault(term, []).extend(postings)
+            if not shard:
+                path.unlink(missing_ok=True)
+                live.discard(key)
+                continue
+            for postings in shard.values():
+                postings.sort(key=lambda p: (-p[1], p[0]))
+            live.add(key)
+            written += self._write(path, _dumps(dict(sorted(shard.items()))))
+        # Shards this index does not list: left by a reset, a FORMAT change or
+        # a lost state file. Published as they are, so never leave them.
+        if shard_dir.is_dir():
+            for path in shard_dir.glob("*.json"):
+                if path.stem not in live:
+                    path.unlink(missing_ok=True)
+
+        self._write(self.root / "docs.json", _dumps({
+            "v": FORMAT, "prefix": PREFIX, "max_term": _MAX_TERM, "stop": sorted(_STOP),
+            "facets": list(FACETS), "shards": sorted(live), "docs": table,
+        }))
+        self._write(self.state_file, _dumps({"notes": dict(sorted(notes.items())),
+                                             "shards": sorted(live)}))
+        return written
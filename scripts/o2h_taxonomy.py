@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+o2h_taxonomy.py
+===============
+Dictionary matcher for the auto-extracted taxonomies (tools, platforms,
+difficulties), built from ``config.yaml`` instead of a hard-coded regex.
+
+A dictionary maps each canonical name to its aliases::
+
+    taxonomy_tools:
+      metasploit:   [msfconsole, msfvenom]
+      crackmapexec: [cme, nxc, netexec]
+      nmap:                                  # no aliases
+
+Names are compiled once into a word-keyed automaton: the text is split into
+``\\w+`` runs in one C-level pass, and the distinct words are intersected
+with the dictionary. That costs the same for 30 names as for 1000, where a
+regex alternation tries every name at every position. Names spanning
+several words (``aircrack-ng``, ``burp suite``) hang off their first word
+and are only looked up (a substring search) when that word occurs.
+Matching follows the old ``\\b…\\b`` rules: case-insensitive, whole words.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Iterable, Mapping
+
+_RE_WORD = re.compile(r"\w+")
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _bounded(text: str, name: str, i: int) -> bool:
+    """``name`` at ``text[i:]`` is not part of a longer word (``\\b…\\b``)."""
+    j = i + len(name)
+    return ((i == 0 or not _is_word(text[i - 1]) or not _is_word(name[0]))
+            and (j == len(text) or not _is_word(text[j]) or not _is_word(name[-1])))
+
+
+def _contains(text: str, name: str) -> bool:
+    i = text.find(name)
+    while i >= 0:
+        if _bounded(text, name, i):
+            return True
+        i = text.find(name, i + 1)
+    return False
+
+
+def _aliases(v: Any) -> list[str]:
+    if v is None:
+        return []
+    return [str(x) for x in v] if isinstance(v, (list, tuple)) else [str(v)]
+
+
+class Matcher:
+    """``{canonical: [alias, …]}`` compiled for whole-word lookups."""
+
+    def __init__(self, entries: Mapping[str, Any] | Iterable[str]):
+        if not isinstance(entries, Mapping):
+            entries = dict.fromkeys(entries)
+        self.words: dict[str, str] = {}                  # one-word name → canonical
+        self.phrases: dict[str, list[tuple[str, str]]] = {}   # first word → (name, canonical)
+        for canonical, aliases in entries.items():
+            canonical = str(canonical).strip().lower()
+            for name in (canonical, *(a.strip().lower() for a in _aliases(aliases))):
+                words = _RE_WORD.findall(name)
+                if not words:
+                    continue   # nothing a word boundary could anchor
+                if words == [name]:
+                    self.words.setdefault(name, canonical)
+                else:
+                    self.phrases.setdefault(words[0], []).append((name, canonical))
+
+    def __len__(self) -> int:
+        return len(self.words) + sum(map(len, self.phrases.values()))
+
+    def find(self, text: str) -> set[str]:
+        """Canonical names of every dictionary entry in ``text``."""
+        text = text.lower()
+        seen = set(_RE_WORD.findall(text))
+        found = {self.words[w] for w in seen & self.words.keys()}
+        for w in seen & self.phrases.keys():
+            found.update(c for name, c in self.phrases[w] if c not in found and _contains(text, name))
+        return found
+
+    def at(self, text: str, pos: int) -> str | None:
+        """Canonical name of the entry starting exactly at ``pos``, if any."""
+        m = _RE_WORD.match(text, pos)
+        if m is None:
+            return None
+        word = m.group().lower()
+        for name, canonical in self.phrases.get(word, ()):
+            if text[pos:pos + len(name)].lower() == name and _bounded(text, name, pos):
+                return canonical
+        return self.words.get(word)
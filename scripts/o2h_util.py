@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+o2h_util.py
+===========
+Plumbing shared by the converter and ``o2h_pdf``: the coloured log, stat
+keys and digests, and the atomic, write-if-changed file writes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sys
+import threading
+from pathlib import Path
+
+
+# ─── Logging ──────────────────────────────────────────────────────────────────
+
+class Color:
+    R = "\033[0;31m"; G = "\033[0;32m"; Y = "\033[1;33m"
+    B = "\033[0;34m"; C = "\033[0;36m"; D = "\033[2m"; X = "\033[0m"
+
+
+class _Fmt(logging.Formatter):
+    LVL = {
+        "DEBUG":   f"{Color.D}[dbg ]{Color.X}",
+        "INFO":    f"{Color.B}[INFO]{Color.X}",
+        "WARNING": f"{Color.Y}[WARN]{Color.X}",
+        "ERROR":   f"{Color.R}[ERR ]{Color.X}",
+    }
+    OK = f"{Color.G}[ OK ]{Color.X}"
+
+    def format(self, rec: logging.LogRecord) -> str:
+        prefix = self.OK if getattr(rec, "ok", False) else self.LVL.get(rec.levelname, rec.levelname)
+        return f"{prefix} {rec.getMessage()}"
+
+
+def setup_logging(verbose: bool) -> None:
+    h = logging.StreamHandler(sys.stderr)
+    h.setFormatter(_Fmt())
+    logging.basicConfig(
+        level=logging.DEBUG if verbose else logging.INFO,
+        handlers=[h],
+        force=True,
+    )
+    # Pillow logs every PNG chunk at DEBUG; -v is about *our* pipeline.
+    logging.getLogger("PIL").setLevel(logging.INFO)
+
+
+log = logging.getLogger("o2h")
+
+
+def ok(msg: str) -> None:
+    log.info(msg, extra={"ok": True})
+
+
+# ─── Files ────────────────────────────────────────────────────────────────────
+
+def stat_key(st: os.stat_result) -> list[int]:
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def title_from_filename(stem: str) -> str:
+    return " ".join(w.capitalize() for w in stem.replace("_", " ").replace("-", " ").split())
+
+
+def write_atomic(dest: Path, write) -> None:
+    """``write(tmp)`` beside ``dest``, then rename: readers never see a torn file."""
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def write_if_changed(dest: Path, data: bytes) -> bool:
+    """Atomically replace ``dest`` with ``data`` unless it already holds exactly
+    that; return whether it was written.
+
+    An untouched file keeps its mtime, so ``hugo server`` sees no event and
+    rebuilds nothing.
+    """
+    try:
+        if dest.stat().st_size == len(data) and dest.read_bytes() == data:
+            return False
+    except OSError:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(dest, lambda t: t.write_bytes(data))
+    return True
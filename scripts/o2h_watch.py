@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+o2h_watch.py
+============
+File-change event sources for ``o2h watch``.
+
+- Inotify: raw Linux inotify through ctypes — no inotify-tools, no process
+  per event, recursive watches added as directories appear.
+- Poller: portable stat-snapshot fallback for macOS, WSL mounts, NFS, …
+
+Both expose ``wait(debounce)``: block until something changes, then keep
+draining until the tree has been quiet for ``debounce`` seconds. One Obsidian
+autosave (3-5 raw events) therefore yields exactly one batch. A batch is a
+set of absolute paths, or ``None`` when events were lost and the caller
+should fall back to a full rescan.
+"""
+
+from __future__ import annotations
+
+import abc
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Iterable
+
+WATCH_SUFFIXES = frozenset({".md", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp"})
+
+
+def _relevant(p: Path, roots: Iterable[Path]) -> bool:
+    if p.suffix.lower() not in WATCH_SUFFIXES:
+        return False
+    for root in roots:
+        try:
+            rel = p.relative_to(root)
+        except ValueError:
+            continue
+        # Same rule as the converter: dot-dirs (.obsidian, .trash) are private.
+        return not any(part.startswith(".") for part in rel.parts)
+    return False
+
+
+class _Source(abc.ABC):
+    roots: list[Path]
+
+    @abc.abstractmethod
+    def _read(self, timeout: float | None) -> set[Path] | None:
+        """Changed paths within ``timeout`` seconds (forever if None): an
+        empty set on timeout, None when events were lost."""
+
+    def wait(self, debounce: float) -> set[Path] | None:
+        batch = self._read(None)
+        lost = batch is None
+        changed: set[Path] = set(batch or ())
+        while True:
+            more = self._read(debounce)
+            if more is None:
+                lost = True
+            elif not more:
+                break
+            else:
+                changed |= more
+        return None if lost else changed
+
+    def close(self) -> None:
+        pass
+
+
+# ─── Linux inotify (ctypes) ───────────────────────────────────────────────────
+
+IN_MODIFY      = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM  = 0x00000040
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW  = 0x00004000
+IN_IGNORED     = 0x00008000
+IN_ISDIR       = 0x40000000
+
+_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+         | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+_EVENT = struct.Struct("iIII")
+
+
+class Inotify(_Source):
+    def __init__(self, roots: Iterable[Path]):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.roots = [Path(r).resolve() for r in roots]
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wd: dict[int, Path] = {}
+        for root in self.roots:
+            self._add_tree(root)
+
+    def _add_tree(self, top: Path) -> list[Path]:
+        """Watch ``top`` and every non-hidden dir below it; return files seen."""
+        found: list[Path] = []
+        for d, dirs, files in os.walk(top):
+            dirs[:] = [x for x in dirs if not x.startswith(".")]
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(d), _MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOSPC:
+                    raise OSError(err, "inotify watch limit reached "
+                                       "(raise fs.inotify.max_user_watches)")
+                continue
+            self._wd[wd] = Path(d)
+            found.extend(Path(d) / f for f in files)
+        return found
+
+    def _read(self, timeout: float | None) -> set[Path] | None:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        out: set[Path] = set()
+        lost = False
+        off = 0
+        while off < len(buf):
+            wd, mask, _cookie, ln = _EVENT.unpack_from(buf, off)
+            off += _EVENT.size
+            name = buf[off:off + ln].rstrip(b"\0")
+            off += ln
+
+            if mask & IN_Q_OVERFLOW:
+                lost = True
+                continue
+            base = self._wd.get(wd)
+            if base is None:
+                continue
+            if mask & IN_IGNORED:
+                self._wd.pop(wd, None)
+                continue
+            path = base / os.fsdecode(name) if name else base
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not path.name.startswith("."):
+                    # New subtree: watch it and treat its files as changed.
+                    out.update(self._add_tree(path))
+                elif mask & IN_MOVED_FROM:
+                    # A whole dir left the tree; we can't enumerate it any more.
+                    lost = True
+                continue
+            out.add(path)
+
+        if lost:
+            return None
+        return {p for p in out if _relevant(p, self.roots)}
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+# ─── Polling fallback ─────────────────────────────────────────────────────────
+
+class Poller(_Source):
+    def __init__(self, roots: Iterable[Path], interval: float = 0.5):
+        self.roots = [Path(r).resolve() for r in roots]
+        self.interval = interval
+        self._snap = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        snap: dict[Path, tuple[int, int]] = {}
+        for root in self.roots:
+            for d, dirs, files in os.walk(root):
+                dirs[:] = [x for x in dirs if not x.startswith(".")]
+                for f in files:
+                    p = Path(d) / f
+                    if p.suffix.lower() not in WATCH_SUFFIXES:
+                        continue
+                    try:
+                        st = p.stat()
+                    except OSError:
+                        continue
+                    snap[p] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def _read(self, timeout: float | None) -> set[Path] | None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval if deadline is None
+                       else max(0.0, min(self.interval, deadline - time.monotonic())))
+            snap = self._scan()
+            old, self._snap = self._snap, snap
+            changed = {p for p in old.keys() | snap.keys() if old.get(p) != snap.get(p)}
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+
+def open_source(roots: Iterable[Path], poll: bool = False,
+                interval: float = 0.5) -> _Source:
+    """Inotify when the kernel offers it, polling otherwise (or on request)."""
+    roots = list(roots)
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return Inotify(roots)
+        except (OSError, AttributeError):
+            pass
+    return Poller(roots, interval)
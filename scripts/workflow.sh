@@ -9,7 +9,8 @@
 #
 # Speed wins over v2:
 #   - Converter has its own SHA-1 cache → unchanged files never re-process
-#   - Watcher debounces inotify bursts (Obsidian autosaves are spammy)
+#   - Resident `o2h watch` debounces inotify bursts in-process (no re-import,
+#     no rescan per save)
 #   - Hugo dev server keeps fast-render ON (drop --disableFastRender)
 #   - Single dispatch table; no duplicated dependency checks
 ###############################################################################
@@ -29,7 +30,7 @@ BOLD=$'\033[1m';    NC=$'\033[0m'
 # ─── Config (env-overridable) ─────────────────────────────────────────────────
 HUGO_PORT="${HUGO_PORT:-1313}"
 HUGO_BIND="${HUGO_BIND:-0.0.0.0}"
-DEBOUNCE_MS="${DEBOUNCE_MS:-400}"
+DEBOUNCE_MS="${DEBOUNCE_MS:-50}"
 OBSIDIAN_DIR="obsidian-vault/posts"
 ATTACH_DIR="obsidian-vault/attachments"
 CONTENT_DIR="content/posts"
@@ -133,37 +134,23 @@ convert_notes() {
     run_converter
 }
 
-# ─── Debounced watcher ────────────────────────────────────────────────────────
-# Obsidian saves trigger 3-5 inotify events in quick succession. Coalesce them
-# by draining the pipe for $DEBOUNCE_MS after the first event before running
-# the converter — turns a "burst storm" into a single fast incremental run.
-start_watcher() {
-    if ! command -v inotifywait >/dev/null 2>&1; then
-        log_warning "inotifywait missing — Hugo will still hot-reload content/"
-        log_info "Install: sudo apt install inotify-tools"
-        return
-    fi
+# ─── Resident watcher ─────────────────────────────────────────────────────────
+# `o2h watch` stays running with a warm Converter + manifest, takes inotify
+# events directly (polling fallback) and debounces bursts in Python — one
+# Obsidian save becomes one tens-of-milliseconds incremental run instead of a
+# fresh interpreter + full vault rescan.
+watch_args() {
+    local extra=(--debounce-ms "$DEBOUNCE_MS")
+    [ "${WATCH_POLL:-0}" = "1" ] && extra+=(--poll)
+    [ "${VERBOSE:-0}" = "1" ]    && extra+=(-v)
+    printf '%s\n' watch --source ./obsidian-vault --output ./content/posts "${extra[@]}"
+}
 
+start_watcher() {
     mkdir -p "$OBSIDIAN_DIR" "$ATTACH_DIR"
-    local debounce_s
-    debounce_s=$(awk -v ms="$DEBOUNCE_MS" 'BEGIN { printf "%.3f", ms/1000 }')
-
-    (
-        inotifywait -m -q -r -e modify,create,move,delete \
-            --format '%w%f' "$OBSIDIAN_DIR" "$ATTACH_DIR" 2>/dev/null |
-        while IFS= read -r changed; do
-            case "$changed" in
-                *.md|*.png|*.jpg|*.jpeg|*.gif|*.svg|*.webp) ;;
-                *) continue ;;
-            esac
-            # Drain any further events arriving within the debounce window.
-            while IFS= read -r -t "$debounce_s" _; do :; done
-            printf '%s[watch]%s %s\n' "$DIM" "$NC" "reconverting…"
-            python3 "$CONVERTER" \
-                --source ./obsidian-vault \
-                --output ./content/posts 2>&1 | tail -3
-        done
-    ) &
+    local args
+    mapfile -t args < <(watch_args)
+    python3 "$CONVERTER" "${args[@]}" &
     WATCHER_PID=$!
     log_success "Watcher running (PID $WATCHER_PID, ${DEBOUNCE_MS}ms debounce)"
 }
@@ -322,8 +309,8 @@ publish_post() {
 
     if [ -z "$slug" ]; then
         local drafts
-        mapfile -t drafts < <(grep -l '^draft: true' "$OBSIDIAN_DIR"/*.md 2>/dev/null \
-                              | sed "s|$OBSIDIAN_DIR/||; s|\.md$||" || true)
+        # Drafts as of the last conversion, listed from the converter's manifest.
+        mapfile -t drafts < <(python3 "$CONVERTER" publish)
         if [ ${#drafts[@]} -eq 0 ]; then
             log_info "No drafts to publish."
             return 0
@@ -339,71 +326,33 @@ publish_post() {
     fi
     [ -z "$slug" ] && { log_error "No slug selected"; exit 1; }
 
-    local file="$OBSIDIAN_DIR/${slug%.md}.md"
-    [ -f "$file" ] || { log_error "Not found: $file"; exit 1; }
-
-    if grep -q '^draft: true' "$file"; then
-        sed -i 's/^draft: true/draft: false/' "$file"
-        log_success "Published: $file"
-        FORCE_CONVERT=1 run_converter
-    else
-        log_info "Already published."
-    fi
+    # Rewrites only the front-matter draft key, then converts just that note.
+    python3 "$CONVERTER" publish "$slug"
 }
 
 # ─── Stats ────────────────────────────────────────────────────────────────────
 stats() {
-    log_header "Blog Stats"
-    local total=0 drafts=0 published=0 words=0
-
-    if [ -d "$OBSIDIAN_DIR" ]; then
-        total=$(find "$OBSIDIAN_DIR" -maxdepth 1 -name '*.md' | wc -l)
-        drafts=$( (grep -l '^draft: true' "$OBSIDIAN_DIR"/*.md 2>/dev/null || true) | wc -l)
-        published=$((total - drafts))
-        # Single concatenated read instead of one cat per file.
-        if [ "$total" -gt 0 ]; then
-            words=$(cat "$OBSIDIAN_DIR"/*.md 2>/dev/null | wc -w)
-        fi
-    fi
-
-    printf '  %-12s %s\n' "Posts:" "$total ($published published, $drafts drafts)"
-    printf '  %-12s %s\n' "Words:" "$words"
-    [ -d public ]        && printf '  %-12s %s\n' "Site size:" "$(du -sh public | cut -f1)"
-    [ -d static/images ] && printf '  %-12s %s\n' "Images:"    "$(find static/images -type f | wc -l) ($(du -sh static/images 2>/dev/null | cut -f1))"
+    # From the converter's manifest: the whole vault, nothing re-read, as of
+    # the last convert/watch. --json for dashboards, -n N for longer lists.
+    case " $* " in *" --json "*) ;; *) log_header "Blog Stats" ;; esac
+    python3 "$CONVERTER" stats "$@"
 }
 
 # ─── Watch (no Hugo) ──────────────────────────────────────────────────────────
 watch_mode() {
     log_header "Watch Mode (no server)"
-    convert_notes
-
-    command -v inotifywait >/dev/null 2>&1 || {
-        log_error "inotifywait required (sudo apt install inotify-tools)"
-        exit 1
-    }
-
-    log_info "Watching $OBSIDIAN_DIR/ + $ATTACH_DIR/ … Ctrl+C to stop"
-    local debounce_s
-    debounce_s=$(awk -v ms="$DEBOUNCE_MS" 'BEGIN { printf "%.3f", ms/1000 }')
-
-    inotifywait -m -q -r -e modify,create,move,delete \
-        --format '%w%f' "$OBSIDIAN_DIR" "$ATTACH_DIR" |
-    while IFS= read -r changed; do
-        case "$changed" in
-            *.md|*.png|*.jpg|*.jpeg|*.gif|*.svg|*.webp) ;;
-            *) continue ;;
-        esac
-        while IFS= read -r -t "$debounce_s" _; do :; done
-        printf '%s[watch]%s %s\n' "$DIM" "$NC" "$changed"
-        run_converter
-    done
+    mkdir -p "$OBSIDIAN_DIR" "$ATTACH_DIR"
+    log_info "Watching obsidian-vault/ … Ctrl+C to stop"
+    local args
+    mapfile -t args < <(watch_args)
+    python3 "$CONVERTER" "${args[@]}"
 }
 
 # ─── Clean ────────────────────────────────────────────────────────────────────
 clean() {
     log_header "Clean Generated Files"
     log_warning "Will delete:"
-    printf '  - content/posts/*\n  - static/images/*\n  - public/\n  - resources/\n  - .cache/o2h/\n'
+    printf '  - content/posts/*\n  - static/images/*\n  - static/search-index/\n  - data/backlinks.json\n  - public/\n  - resources/\n  - .cache/o2h/\n'
 
     if [ "${FORCE:-0}" != "1" ]; then
         local ans
@@ -411,7 +360,7 @@ clean() {
         case "$ans" in [yY]|[yY][eE][sS]) ;; *) log_info "Aborted"; exit 0 ;; esac
     fi
 
-    rm -rf content/posts/* static/images/* public resources .cache/o2h 2>/dev/null || true
+    rm -rf content/posts/* static/images/* static/search-index data/backlinks.json public resources .cache/o2h 2>/dev/null || true
     log_success "Cleaned"
 }
 
@@ -429,12 +378,13 @@ ${CYAN}WRITER COMMANDS${NC}
     ${BOLD}new${NC} ["title"] [template]   Scaffold a post (interactive if no args)
     ${BOLD}serve${NC}                       Convert + watch + dev server (default)
     ${BOLD}publish${NC} [slug]              Flip draft→published (interactive if no slug)
+    ${BOLD}unpublish${NC} <slug>            Turn a published post back into a draft
 
 ${CYAN}MAINTENANCE${NC}
     ${BOLD}convert${NC}                     One-shot incremental conversion
     ${BOLD}watch${NC}                       Watch + auto-convert (no server)
     ${BOLD}build${NC}                       Production build (minified) + stats
-    ${BOLD}stats${NC}                       Post / word / size counts
+    ${BOLD}stats${NC} [--json] [-n N]       Notes / words / taxonomies / largest notes + images
     ${BOLD}clean${NC}                       Wipe generated content (FORCE=1 skips prompt)
     ${BOLD}clean-cache${NC}                 Drop converter SHA-1 cache
     ${BOLD}setup${NC}                       Create directory structure
@@ -449,7 +399,8 @@ ${CYAN}ENV OVERRIDES${NC}
     FORCE_CONVERT=1        Bypass converter cache
     VERBOSE=1              Debug logging in converter
     FORCE=1                Skip 'clean' confirmation
-    DEBOUNCE_MS=400        Watcher debounce window
+    DEBOUNCE_MS=50         Watcher debounce window
+    WATCH_POLL=1           Poll instead of inotify (network mounts, WSL)
 
 ${CYAN}EXAMPLES${NC}
     $0 new                                # interactive: prompts for title + template
@@ -468,10 +419,11 @@ main() {
         new)            shift; new_post "$@" ;;
         serve)          check_dependencies; setup_directories; convert_notes; serve_site ;;
         publish)        shift; check_dependencies; publish_post "$@" ;;
+        unpublish)      shift; check_dependencies; python3 "$CONVERTER" unpublish "$@" ;;
         convert)        check_dependencies; setup_directories; convert_notes ;;
         watch)          check_dependencies; setup_directories; watch_mode ;;
         build)          check_dependencies; FORCE_CONVERT=1 convert_notes; build_site ;;
-        stats)          stats ;;
+        stats)          shift; stats "$@" ;;
         clean)          clean ;;
         clean-cache)    python3 "$CONVERTER" --clean-cache ;;
         setup)          check_dependencies; setup_directories; log_success "Setup complete" ;;